@@ -4,10 +4,12 @@ import pytest
 # Ensure tests use a lightweight SQLite DB so pytest can run without Docker/Postgres
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 from django.conf import settings
-settings.DATABASES["default"] = {
+# Update in place so connections opened from other threads (channels consumers,
+# sync_to_async) see the same fully-defaulted settings dict
+settings.DATABASES["default"].update({
     "ENGINE": "django.db.backends.sqlite3",
     "NAME": ":memory:",
-}
+})
 
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
@@ -25,6 +27,23 @@ def pytest_configure(config=None):
         pass
 
 
+@pytest.fixture(autouse=True)
+def snapshot_cache():
+    """
+    一覧のスナップショットのキャッシュをテストごとに空にする。
+
+    テストごとに DB は巻き戻るが、キャッシュはプロセス内に残るため。
+    """
+    from django.core.cache import cache
+    from tasks import snapshots
+
+    cache.clear()
+    snapshots.clear()
+    yield
+    cache.clear()
+    snapshots.clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -48,3 +67,95 @@ def auth_client(api_client, create_user):
     # Use force_authenticate to avoid depending on JWT token issuance in tests
     api_client.force_authenticate(user=user)
     return api_client, user
+
+
+@pytest.fixture
+def channel_layer():
+    """テストごとに空の状態から始まるチャンネルレイヤー"""
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+
+    layer = get_channel_layer()
+    async_to_sync(layer.flush)()
+    yield layer
+    async_to_sync(layer.flush)()
+
+
+@pytest.fixture
+def slack_webhook(monkeypatch):
+    """
+    ローカルで動く Slack webhook のスタブサーバー。
+
+    受け取ったペイロードは ``requests`` に溜まる。``fail_next`` に数を入れると
+    その回数だけ ``fail_status``（デフォルト 500）を ``fail_headers`` 付きで返し、
+    ``delay`` 秒だけ応答を遅らせることもできる。``attempts`` は受けた POST の数。
+    """
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from types import SimpleNamespace
+
+    state = SimpleNamespace(
+        requests=[], attempts=0, fail_next=0, fail_status=500, fail_headers={}, delay=0, url=None,
+    )
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            import time
+
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            state.attempts += 1
+            time.sleep(state.delay)
+            if state.fail_next:
+                state.fail_next -= 1
+                self.send_response(state.fail_status)
+                for name, value in state.fail_headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+            state.requests.append(json.loads(body))
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    state.url = f"http://127.0.0.1:{server.server_address[1]}/webhook"
+    monkeypatch.setenv("SLACK_WEBHOOK_URL", state.url)
+    yield state
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    ブロック内で実行される SQL の件数を固定するアサーション。
+
+        with query_budget(3):
+            client.get("/api/tasks/")
+
+    件数が違う場合は実行された SQL の一覧を付けて失敗する。
+    """
+    from contextlib import contextmanager
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    @contextmanager
+    def _budget(expected):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        executed = len(ctx.captured_queries)
+        if executed != expected:
+            statements = "\n".join(
+                f"  {i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, start=1)
+            )
+            pytest.fail(f"Expected {expected} queries, {executed} were executed:\n{statements}")
+
+    return _budget
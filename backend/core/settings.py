@@ -56,11 +56,66 @@ INSTALLED_APPS = [
 ]
 
 ASGI_APPLICATION = "core.asgi.application"
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
+
+# Channel layer
+# memory: 単一プロセス用（デフォルト）
+# redis:  複数の daphne プロセス間でイベントを配信する（REDIS_URL が必要）
+REDIS_URL = os.getenv("REDIS_URL") or None
+CHANNEL_LAYER_BACKEND = os.getenv("CHANNEL_LAYER_BACKEND", "redis" if REDIS_URL else "memory")
+
+if CHANNEL_LAYER_BACKEND == "redis":
+    if not REDIS_URL:
+        raise ValueError("REDIS_URL must be set when CHANNEL_LAYER_BACKEND=redis")
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [REDIS_URL],
+                "capacity": int(os.getenv("CHANNEL_LAYER_CAPACITY", "1500")),
+                "expiry": 10,
+            },
+        }
     }
-}
+elif CHANNEL_LAYER_BACKEND == "memory":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
+else:
+    raise ValueError(f"Unknown CHANNEL_LAYER_BACKEND: {CHANNEL_LAYER_BACKEND}")
+
+# WebSocket 接続ごとの未送信メッセージの上限（超えると全件の取り直しを要求）
+WS_OUTBOUND_QUEUE_SIZE = int(os.getenv("WS_OUTBOUND_QUEUE_SIZE", "256"))
+
+# encoding: "zlib" のクライアントへ圧縮して送る最小サイズ（バイト）と圧縮レベル
+WS_COMPRESS_MIN_BYTES = int(os.getenv("WS_COMPRESS_MIN_BYTES", "1024"))
+WS_COMPRESS_LEVEL = int(os.getenv("WS_COMPRESS_LEVEL", "6"))
+
+# WebSocket の再接続時に再送できるイベントの件数（tasks/events.py）
+TASK_EVENT_LOG_MAXLEN = int(os.getenv("TASK_EVENT_LOG_MAXLEN", "1000"))
+# 設定すると複数プロセスでリビジョンとイベントログを共有する（Redis 利用時はデフォルトで共有）
+TASK_EVENT_LOG_REDIS_URL = os.getenv("TASK_EVENT_LOG_REDIS_URL") or REDIS_URL
+
+# 一覧 API のスナップショットとボードのリビジョン（tasks/snapshots.py）
+# 複数プロセスで動かす場合はリビジョンを共有するため Redis を使う
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+TASK_SNAPSHOT_CACHE = "default"
+
+# 差分同期（GET /api/tasks/changes/）のために削除の記録を残す日数
+TASK_TOMBSTONE_RETENTION_DAYS = int(os.getenv("TASK_TOMBSTONE_RETENTION_DAYS", "30"))
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -90,6 +145,12 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
 }
 
+# WebSocket 認証でデコード済みトークンのユーザーをキャッシュする（tasks/middleware.py）
+# キャッシュはプロセスごと。ユーザーを無効化しても他のプロセスでは最大 TTL 秒の間
+# そのトークンで接続できるので、TTL は短めにしておく。
+WS_TOKEN_CACHE_SIZE = int(os.getenv("WS_TOKEN_CACHE_SIZE", "1024"))
+WS_TOKEN_CACHE_TTL = int(os.getenv("WS_TOKEN_CACHE_TTL", "60"))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -195,6 +256,20 @@ else:
     CORS_ALLOWED_ORIGINS = CORS_ALLOWED_ORIGINS.split(',')
     CORS_ALLOW_ALL_ORIGINS = False
 
+# ボードへの配信をまとめる間隔（秒）。0 なら書き込みごとにすぐ送る（tasks/broadcast.py）
+BROADCAST_COALESCE_WINDOW = float(os.getenv("BROADCAST_COALESCE_WINDOW", "0.05"))
+
+# Slack 通知をまとめて送信する間隔（秒）（tasks/slack_notifier.py）
+SLACK_BATCH_WINDOW = float(os.getenv("SLACK_BATCH_WINDOW", "1.0"))
+
+# /metrics で Prometheus 形式のメトリクスを公開する（tasks/metrics.py）
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False") == "True"
+# 設定すると Authorization: Bearer <token> が必要になる
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+# フロントエンドがボードのリビジョンを読めるようにする
+CORS_EXPOSE_HEADERS = ["X-Board-Revision", "ETag"]
+
 # CSRF Settings for production
 if os.getenv('CSRF_TRUSTED_ORIGINS'):
     CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED_ORIGINS').split(',')
@@ -15,3 +15,16 @@ DATABASES["default"]["ATOMIC_REQUESTS"] = False
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.MD5PasswordHasher",
 ]
+
+# Keep tests self-contained even when REDIS_URL is set in the environment
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    }
+}
+TASK_EVENT_LOG_REDIS_URL = None
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
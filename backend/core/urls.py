@@ -5,6 +5,7 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from tasks.metrics import metrics_view
 from . import views
 
 urlpatterns = [
@@ -25,6 +26,9 @@ urlpatterns = [
     path("api/forgot-password/", views.forgot_password),
     path("api/reset-password/", views.reset_password),
 
+    # Prometheus のスクレイプ用（METRICS_ENABLED の時だけ）
+    path("metrics", metrics_view),
+
     # フロント用
     path("", views.home),
 ]
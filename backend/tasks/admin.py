@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Task
+from .models import Board, Task, TaskTombstone
 
 admin.site.register(Task)
+admin.site.register(Board)
+admin.site.register(TaskTombstone)
 
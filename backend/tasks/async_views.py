@@ -0,0 +1,322 @@
+"""
+タスク API の非同期版（/api/async/tasks/）。
+
+TaskViewSet（/api/tasks/）と同じ一覧・作成・取得・更新・削除・並び替えを
+Django の非同期ビューで提供する。ASGI（daphne）の上ではリクエスト全体を
+同期スレッドへ渡さずに処理し、認証は WebSocket と同じトークンキャッシュ、
+配信は同期版と同じティッカー（tasks/broadcast.py）に渡し、同じイベントループ上の
+タスクが channel_layer.group_send を await する（まとめない設定ならその場で await する）。
+
+既存の API と同じ権限・版の確認・スナップショット・削除の記録・Slack 通知を行う。
+ただし次の点は同期版に任せている。
+
+- ページ分割と ?fields（一覧は全件のスナップショットのみ）
+- 一括操作（/api/tasks/bulk/）と差分同期（/api/tasks/changes/）
+- 本文に board を含む作成・更新の検証（メンバーの確認が同期 ORM なのでスレッドで行う）
+- 削除（削除の記録と同じトランザクションにするためスレッドで行う）とカラムの振り直し
+
+Django の非同期 ORM も現状はクエリごとに同期スレッドで実行されるので、
+違いが出るのはリクエスト全体の受け渡しと配信（async_to_sync）の分になる。
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+
+from .broadcast import BoardChanges, abroadcast
+from .concurrency import VersionConflict, asave_task, delete_task, requested_version, task_etag
+from .events import call_event_log
+from .middleware import get_user_from_token
+from .models import Board, Task
+from .ordering import anext_order, aplace_task
+from .serializers import TaskCardSerializer, TaskSerializer
+from .slack_notifier import (
+    notify_task_created,
+    notify_task_done,
+    notify_task_title_updated,
+    send_slack_notification,
+)
+from .snapshots import (
+    aboard_revisions,
+    aboard_snapshot,
+    abump_board_revision,
+    etag_matches,
+    local_cache,
+    snapshot_etag,
+)
+from .views import REORDER_ATTEMPTS, visible_tasks
+
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, headers=headers, content_type="application/json",
+    )
+
+
+def error_response(message, status):
+    return json_response({"error": message}, status=status)
+
+
+async def visible_board_ids(user):
+    """views.visible_board_ids の非同期版"""
+    boards = Board.objects.all() if user.is_staff else user.boards.all()
+    return [None] + [board_id async for board_id in boards.order_by("id").values_list("id", flat=True)]
+
+
+async def load_board_rows(board_id):
+    """views.load_board_rows の非同期版"""
+    tasks = Task.objects.filter(board_id=board_id).select_related("user").order_by("status", "order", "id")
+    return [dict(row) for row in TaskCardSerializer([t async for t in tasks], many=True).data]
+
+
+async def publish_task_update(task):
+    changes = BoardChanges()
+    changes.update(TaskCardSerializer(task).data)
+    await abroadcast(task.board_id, changes)
+
+
+async def invalidate_board(board_id):
+    # 非同期のビューはオートコミットなので、書き込みの後に 1 回進めれば足りる
+    await abump_board_revision(board_id)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncTaskView(View):
+    """JWT の認証・JSON の読み込み・エラー応答をまとめた基底クラス"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        auth = request.headers.get("Authorization", "")
+        scheme, _, token = auth.partition(" ")
+        user = await get_user_from_token(token) if scheme == "Bearer" and token else None
+        if user is None or user.is_anonymous:
+            return error_response("認証情報が含まれていません。", 401)
+        # シリアライザーの検証（validate_board）が request.user を見る
+        request.user = user
+        self.user = user
+
+        self.data = {}
+        if request.body:
+            try:
+                self.data = json.loads(request.body)
+            except ValueError:
+                return error_response("invalid JSON", 400)
+            if not isinstance(self.data, dict):
+                return error_response("JSON object is required", 400)
+        # requested_version は DRF の Request と同じ .data を読む
+        request.data = self.data
+
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except VersionConflict as exc:
+            return await self.conflict_response(exc.task_id)
+        except APIException as exc:
+            return json_response(exc.detail, status=exc.status_code)
+
+    async def conflict_response(self, task_id):
+        current = await visible_tasks(self.user).select_related("user").filter(pk=task_id).afirst()
+        if current is None:
+            return error_response("task not found", 404)
+        return json_response(
+            {"error": "タスクは他のユーザーによって更新されています。", "task": TaskSerializer(current).data},
+            status=409,
+            headers={"ETag": task_etag(current)},
+        )
+
+    async def validate(self, serializer):
+        """シリアライザーを検証する（board の確認は DB を読むのでスレッドで行う）"""
+        if "board" in self.data:
+            valid = await sync_to_async(serializer.is_valid)()
+        else:
+            valid = serializer.is_valid()
+        return valid
+
+    def serializer(self, *args, **kwargs):
+        return TaskSerializer(*args, context={"request": self.request}, **kwargs)
+
+
+class TaskListView(AsyncTaskView):
+    async def get(self, request):
+        board = request.GET.get("board")
+        if board:
+            try:
+                board = int(board)
+            except ValueError:
+                return error_response("invalid board", 400)
+        else:
+            board = None
+        column = request.GET.get("status")
+        if column and column not in dict(Task.STATUS_CHOICES):
+            return error_response("invalid status", 400)
+
+        revision = await call_event_log("current_revision")
+        board_ids = await visible_board_ids(self.user)
+        if board is not None:
+            board_ids = [board] if board in board_ids else []
+
+        revisions = await aboard_revisions(board_ids)
+        etag = snapshot_etag(revisions, column)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Board-Revision": str(revision)}
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return HttpResponseNotModified(headers=headers)
+
+        cached = local_cache.get(etag)
+        if cached is None:
+            rows = []
+            for board_id, board_revision in revisions.items():
+                rows.extend(await aboard_snapshot(
+                    board_id, board_revision, lambda board_id=board_id: load_board_rows(board_id),
+                ))
+            if column:
+                rows = [row for row in rows if row["status"] == column]
+            rows.sort(key=lambda row: (row["status"], row["order"], row["id"]))
+            cached = (rows, JSONRenderer().render(rows))
+            local_cache.set(etag, cached)
+
+        _, body = cached
+        return HttpResponse(body, headers=headers, content_type="application/json")
+
+    async def post(self, request):
+        serializer = self.serializer(data=self.data)
+        if not await self.validate(serializer):
+            return json_response(serializer.errors, status=400)
+
+        validated = serializer.validated_data
+        board = validated.get("board")
+        order = await anext_order(validated.get("status", "todo"), board.id if board else None)
+        task = await Task.objects.acreate(user=self.user, order=order, **validated)
+
+        await invalidate_board(task.board_id)
+        await publish_task_update(task)
+        notify_task_created(task)
+        return json_response(TaskSerializer(task).data, status=201)
+
+
+class TaskDetailView(AsyncTaskView):
+    http_method_names = ["get", "put", "patch", "delete", "options"]
+
+    async def get_task(self, pk):
+        try:
+            return await visible_tasks(self.user).select_related("user").aget(pk=pk)
+        except Task.DoesNotExist:
+            return None
+
+    async def get(self, request, pk):
+        task = await self.get_task(pk)
+        if task is None:
+            return error_response("task not found", 404)
+        return json_response(TaskSerializer(task).data, headers={"ETag": task_etag(task)})
+
+    async def patch(self, request, pk):
+        return await self.update(request, pk, partial=True)
+
+    async def put(self, request, pk):
+        return await self.update(request, pk, partial=False)
+
+    async def update(self, request, pk, partial):
+        task = await self.get_task(pk)
+        if task is None:
+            return error_response("task not found", 404)
+
+        serializer = self.serializer(task, data=self.data, partial=partial)
+        if not await self.validate(serializer):
+            return json_response(serializer.errors, status=400)
+        validated = serializer.validated_data
+        is_owner = task.user_id == self.user.id
+
+        if "board" in validated and getattr(validated["board"], "id", None) != task.board_id:
+            return error_response("タスクを別のボードへ移すことはできません。", 400)
+        if "title" in validated and not is_owner:
+            return json_response({"detail": "タスク名を変更できるのは作成者だけです。"}, status=403)
+
+        old_title = task.title
+        old_status = task.status
+        expected_version = requested_version(request)
+        for field, value in validated.items():
+            setattr(task, field, value)
+        await asave_task(task, list(validated), expected_version)
+
+        await invalidate_board(task.board_id)
+        await publish_task_update(task)
+        if "title" in validated:
+            notify_task_title_updated(old_title, validated["title"], self.user.username)
+        if validated.get("status") == "done" and old_status != "done":
+            notify_task_done(task)
+        return json_response(TaskSerializer(task).data)
+
+    async def delete(self, request, pk):
+        task = await self.get_task(pk)
+        if task is None:
+            return error_response("task not found", 404)
+        if task.user_id != self.user.id:
+            return json_response({"detail": "このタスクを削除できるのは作成者だけです。"}, status=403)
+
+        expected_version = requested_version(request)
+        if expected_version is None:
+            expected_version = task.version
+        await sync_to_async(delete_task)(task.id, task.board_id, expected_version)
+
+        await invalidate_board(task.board_id)
+        changes = BoardChanges()
+        changes.delete(task.id)
+        await abroadcast(task.board_id, changes)
+        send_slack_notification(
+            f"タスク「{task.title}」(ID: {task.id}) が削除されました。\n削除者: @{self.user.username}",
+            "🗑️ タスク削除",
+            "#d32f2f",
+        )
+        return HttpResponse(status=204)
+
+
+class TaskReorderView(AsyncTaskView):
+    http_method_names = ["post", "options"]
+
+    async def post(self, request):
+        task_id = self.data.get("task_id")
+        new_status = self.data.get("status")
+        if task_id is None:
+            return error_response("task_id is required", 400)
+        if new_status not in dict(Task.STATUS_CHOICES):
+            return error_response("invalid status", 400)
+        try:
+            new_order = int(self.data.get("order"))
+        except (TypeError, ValueError):
+            return error_response("invalid order", 400)
+
+        expected_version = requested_version(request)
+
+        for attempt in range(REORDER_ATTEMPTS):
+            try:
+                task = await visible_tasks(self.user).select_related("user").aget(id=task_id)
+            except (Task.DoesNotExist, ValueError):
+                return error_response("task not found", 404)
+
+            is_owner = task.user_id == self.user.id
+            old_status = task.status
+            if not is_owner and not self.user.is_staff:
+                return error_response("他のユーザーのタスクは移動できません。", 403)
+            if not is_owner and new_status != old_status:
+                return error_response("管理者でも、他のユーザーのタスクを別のカラムへは移動できません。", 403)
+            if expected_version is not None and task.version != expected_version:
+                raise VersionConflict(task.id)
+
+            try:
+                moved = await aplace_task(task, new_status, new_order)
+            except VersionConflict:
+                if expected_version is not None or attempt == REORDER_ATTEMPTS - 1:
+                    raise
+                continue
+            break
+
+        await invalidate_board(task.board_id)
+        # 行数が多ければ全件同期にフォールバックする
+        changes = BoardChanges()
+        changes.move(moved)
+        await abroadcast(task.board_id, changes)
+        if new_status == "done" and old_status != "done":
+            notify_task_done(task)
+        return json_response({"status": "ok", "moved": moved})
@@ -0,0 +1,335 @@
+"""
+トランザクションに合わせた配信バッファ。
+
+ビューで発生した WebSocket イベントと Slack 通知はすぐには送らず、
+transaction.on_commit で確定したものだけをリクエスト単位のバッファに溜める。
+ロールバックされた変更は配信されない。
+
+バッファは同じタスクへの複数の更新を最新の状態 1 つにまとめ、リクエストの
+最後にボードごとに送信する。ボードへのイベントが 1 つならそのまま、
+複数なら 1 つの task_batch イベントとして配信する。
+
+送信はプロセスで共有する BroadcastTicker を通す。ティッカーは複数の
+リクエストの変更を BROADCAST_COALESCE_WINDOW 秒ごとにボード単位でまとめ、
+ASGI サーバーのイベントループ上で送るので、同時に多くの編集があっても
+ボードへの配信は 1 ウィンドウに 1 回程度に抑えられる。
+"""
+import asyncio
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import SyncToAsync
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .events import apublish_event, board_group, publish_event
+
+logger = logging.getLogger(__name__)
+
+# task_move で差分配信する行数の上限（超えた場合は全件同期）
+TASK_MOVE_DELTA_LIMIT = 500
+
+_current_buffer = ContextVar("broadcast_buffer", default=None)
+
+
+class BoardChanges:
+    """1 つのボードに対する未送信の変更"""
+
+    def __init__(self):
+        self.updates = OrderedDict()
+        self.moves = OrderedDict()
+        self.deletes = OrderedDict()
+        self.snapshot = False
+
+    def update(self, data):
+        """タスクの最新状態（シリアライズ済み）。同じタスクの古い更新・移動は捨てる"""
+        self.moves.pop(data["id"], None)
+        self.updates.pop(data["id"], None)
+        self.updates[data["id"]] = dict(data)
+
+    def move(self, rows):
+        """並び替えで変わった行（id, status, order, version）"""
+        for row in rows:
+            pending = self.updates.get(row["id"])
+            if pending is not None:
+                # 未送信の更新があればそこへ反映する
+                pending.update({k: row[k] for k in ("status", "order", "version") if k in row})
+            else:
+                self.moves[row["id"]] = row
+
+    def delete(self, task_id):
+        self.updates.pop(task_id, None)
+        self.moves.pop(task_id, None)
+        self.deletes[task_id] = True
+
+    def merge(self, other):
+        """後から届いた変更 other を取り込む（同じタスクは other の状態が残る）"""
+        for data in other.updates.values():
+            self.update(data)
+        self.move(other.moves.values())
+        for task_id in other.deletes:
+            self.delete(task_id)
+        self.snapshot = self.snapshot or other.snapshot
+
+    def needs_snapshot(self):
+        return self.snapshot or len(self.moves) > TASK_MOVE_DELTA_LIMIT
+
+    def events(self, board_id):
+        if self.needs_snapshot():
+            # カラムの大規模な振り直しは全件同期にフォールバック
+            events = [snapshot_event(board_id)]
+        else:
+            events = [{"type": "task_update", "task": data} for data in self.updates.values()]
+            if self.moves:
+                events.append({"type": "task_move", "tasks": list(self.moves.values())})
+        events.extend({"type": "task_delete", "task_id": task_id} for task_id in self.deletes)
+        return events
+
+
+class BroadcastBuffer:
+    """コミット済みの変更をまとめて配信するバッファ"""
+
+    def __init__(self):
+        self._boards = OrderedDict()
+        self._notifications = []
+
+    def _board(self, board_id):
+        if board_id not in self._boards:
+            self._boards[board_id] = BoardChanges()
+        return self._boards[board_id]
+
+    def task_update(self, data, board_id):
+        self._board(board_id).update(data)
+
+    def task_move(self, rows, board_id):
+        self._board(board_id).move(rows)
+
+    def task_delete(self, task_id, board_id):
+        self._board(board_id).delete(task_id)
+
+    def snapshot(self, board_id):
+        """ボードの全件を配信する（送信時点の状態を読む）"""
+        self._board(board_id).snapshot = True
+
+    def notify(self, func, *args):
+        """Slack 通知（配信の後に送る）"""
+        self._notifications.append((func, args))
+
+    def flush(self):
+        boards, self._boards = self._boards, OrderedDict()
+        notifications, self._notifications = self._notifications, []
+
+        for board_id, changes in boards.items():
+            broadcast(board_id, changes)
+
+        for func, args in notifications:
+            func(*args)
+
+
+def board_message(events):
+    """ボードへ送る 1 つのイベント（複数なら task_batch にまとめる）"""
+    if len(events) == 1:
+        return events[0]
+    return {"type": "task_batch", "events": events}
+
+
+def publish_changes(board_id, changes):
+    events = changes.events(board_id)
+    if events:
+        publish_event(board_message(events), group=board_group(board_id))
+
+
+async def apublish_changes(board_id, changes):
+    """publish_changes の非同期版（全件同期を読む場合だけスレッドで実行する）"""
+    if changes.needs_snapshot():
+        events = await database_sync_to_async(changes.events)(board_id)
+    else:
+        events = changes.events(board_id)
+    if events:
+        await apublish_event(board_message(events), group=board_group(board_id))
+
+
+def _server_loop():
+    """
+    配信を送るイベントループ（ASGI サーバーのループ）。
+
+    非同期コードからはそのループ、sync_to_async で実行中の同期ビューからは
+    asgiref が記録している呼び出し元のループを返す。どちらでもなければ None。
+    """
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    # AsyncToSync が同じ値を使って呼び出し元のループへ戻っている
+    threadlocal = SyncToAsync.threadlocal
+    if getattr(threadlocal, "main_event_loop_pid", None) != os.getpid():
+        return None
+    loop = getattr(threadlocal, "main_event_loop", None)
+    if loop is None or loop.is_closed():
+        return None
+    return loop
+
+
+class BroadcastTicker:
+    """
+    ボードごとに配信をまとめて頻度を抑えるティッカー。
+
+    変更はボードごとの BoardChanges に溜め、ASGI サーバーのイベントループ上の
+    タスクが送信する（channel_layer のキューや接続はそのループに属するので、
+    別スレッドのループから送ると配信が止まる）。
+    しばらく配信していないボードの変更はすぐに送り、送信後 window 秒の間に
+    届いた変更は同じタスクの最新状態だけを残して window の終わりに 1 つの
+    イベント（複数なら task_batch）として送る。書き込みの頻度に関係なく、
+    ボードへの配信は window 秒に 1 回程度になる。
+    window が 0 以下の場合と、イベントループの外（管理コマンドや WSGI）から
+    呼ばれた場合は、offer は変更をそのまま返し、呼び出し側がすぐに送る。
+    """
+
+    def __init__(self, window=0.05):
+        self.window = window
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        # 以下はイベントループのスレッドからだけ触る
+        # ボードごとの次に送信できる時刻（loop.time()）と送信中のタスク
+        self._next_send = {}
+        self._drains = {}
+
+    def offer(self, board_id, changes):
+        """
+        変更を渡す（ブロックしない）。
+
+        まとめずにすぐ送るべき場合は changes を返す。
+        """
+        loop = _server_loop() if self.window > 0 else None
+        if loop is None:
+            return changes
+        with self._lock:
+            pending = self._pending.get(board_id)
+            if pending is None:
+                self._pending[board_id] = changes
+            else:
+                pending.merge(changes)
+
+        try:
+            in_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._schedule(board_id)
+        else:
+            loop.call_soon_threadsafe(self._schedule, board_id)
+        return None
+
+    def flush(self):
+        """溜まっている変更をすべて呼び出し元のスレッドで送る（テスト・終了処理用）"""
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+        for board_id, changes in pending.items():
+            publish_changes(board_id, changes)
+
+    def _schedule(self, board_id):
+        """（ループ上）ボードの送信タスクが無ければ始める"""
+        loop = asyncio.get_running_loop()
+        drain = self._drains.get(board_id)
+        if drain is not None and not drain.done() and drain.get_loop() is loop:
+            return
+        now = loop.time()
+        # 送信済みの時刻は次のウィンドウを過ぎれば不要
+        self._next_send = {b: t for b, t in self._next_send.items() if t > now}
+        self._drains[board_id] = loop.create_task(self._drain(board_id))
+
+    async def _drain(self, board_id):
+        """（ループ上）ウィンドウごとにボードの変更を送り、溜まっていなければ終わる"""
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self._next_send.get(board_id, 0) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            with self._lock:
+                changes = self._pending.pop(board_id, None)
+            if changes is None:
+                return
+            self._next_send[board_id] = loop.time() + self.window
+            try:
+                await apublish_changes(board_id, changes)
+            except Exception:
+                logger.exception("Broadcast ticker failed")
+            with self._lock:
+                if board_id not in self._pending:
+                    # 次の変更が届けば _schedule が新しく始める（_next_send までは待つ）
+                    return
+
+
+_ticker = None
+_ticker_lock = threading.Lock()
+
+
+def get_ticker():
+    """プロセスで共有する BroadcastTicker"""
+    global _ticker
+    if _ticker is None:
+        with _ticker_lock:
+            if _ticker is None:
+                _ticker = BroadcastTicker(window=getattr(settings, "BROADCAST_COALESCE_WINDOW", 0.05))
+    return _ticker
+
+
+def broadcast(board_id, changes):
+    """ボードの変更をティッカーに渡す（まとめない設定ならすぐに送る）"""
+    changes = get_ticker().offer(board_id, changes)
+    if changes is not None:
+        publish_changes(board_id, changes)
+
+
+async def abroadcast(board_id, changes):
+    """broadcast の非同期版"""
+    changes = get_ticker().offer(board_id, changes)
+    if changes is not None:
+        await apublish_changes(board_id, changes)
+
+
+def snapshot_event(board_id):
+    """ボードの全タスクをカード形式で（board_id が None なら共有ボード）"""
+    from .models import Task
+    from .serializers import TaskCardSerializer
+
+    tasks = TaskCardSerializer(
+        Task.objects.filter(board_id=board_id).select_related("user").order_by("status", "order", "id"),
+        many=True,
+    ).data
+    return {"type": "task_bulk_update", "tasks": tasks}
+
+
+@contextmanager
+def deferred_broadcasts():
+    """
+    ブロック内で記録された変更をまとめ、最後に 1 回だけ配信する。
+
+    外側のトランザクションがあればそのコミット後に配信する。
+    """
+    buffer = BroadcastBuffer()
+    token = _current_buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _current_buffer.reset(token)
+    transaction.on_commit(buffer.flush)
+
+
+def defer(method, *args):
+    """
+    現在のトランザクションがコミットされたらバッファへ変更を記録する。
+
+    deferred_broadcasts の外で呼ばれた場合は、コミット後にその変更だけを配信する。
+    """
+    buffer = _current_buffer.get()
+    if buffer is None:
+        buffer = BroadcastBuffer()
+        transaction.on_commit(lambda: (getattr(buffer, method)(*args), buffer.flush()))
+        return
+    transaction.on_commit(lambda: getattr(buffer, method)(*args))
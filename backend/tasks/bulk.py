@@ -0,0 +1,176 @@
+"""
+タスクの一括操作（POST /api/tasks/bulk/）。
+
+{"operations": [
+    {"op": "create", "title": "...", "status": "todo", "board": null},
+    {"op": "update", "id": 1, "title": "...", "description": "...", "status": "done"},
+    {"op": "move", "id": 2, "status": "in_progress", "order": 0},
+    {"op": "delete", "id": 3}
+]}
+
+すべての操作を検証してから 1 つのトランザクションで実行する。
+実行順は update → move → create → delete で、update/create はまとめて
+bulk_update / bulk_create する。どれか 1 つでも失敗すれば何も変更しない。
+権限のルールは単体の API と同じ。
+update / move / delete に version を付けると、対象のタスクの版が違う場合に
+409 で全体を失敗させる（対象の行はロックしているのでメモリ上で比べる）。
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task, TaskTombstone
+from .ordering import ORDER_GAP, next_order, place_task
+from .serializers import TaskSerializer
+
+# 1 リクエストで受け付ける操作数の上限
+BULK_MAX_OPERATIONS = 500
+
+UPDATABLE_FIELDS = ("title", "description", "status")
+
+
+class BulkOperationError(Exception):
+    def __init__(self, index, message, status_code=400):
+        super().__init__(message)
+        self.index = index
+        self.message = message
+        self.status_code = status_code
+
+
+class BulkResult:
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.moved = []
+        self.deleted = []
+
+    def counts(self):
+        return {
+            "created": len(self.created),
+            "updated": len(self.updated),
+            "moved": len({row["id"] for row in self.moved}),
+            "deleted": len(self.deleted),
+        }
+
+
+def apply_bulk_operations(user, operations, queryset, context):
+    """
+    一括操作を検証・実行して BulkResult を返す。
+
+    queryset はユーザーが操作できるタスク（TaskViewSet と同じ範囲）。
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BulkOperationError(None, "operations must be a non-empty list")
+    if len(operations) > BULK_MAX_OPERATIONS:
+        raise BulkOperationError(None, f"too many operations (max {BULK_MAX_OPERATIONS})")
+
+    ids = {
+        op.get("id") for op in operations
+        if isinstance(op, dict) and op.get("op") != "create" and isinstance(op.get("id"), int)
+    }
+    valid_statuses = [s[0] for s in Task.STATUS_CHOICES]
+    result = BulkResult()
+
+    with transaction.atomic():
+        tasks = {
+            t.id: t
+            for t in queryset.select_related("user").select_for_update(of=("self",)).filter(id__in=ids)
+        }
+
+        creates, updates, moves, deletes = [], {}, [], []
+        changed_fields = set()
+
+        for index, op in enumerate(operations):
+            if not isinstance(op, dict):
+                raise BulkOperationError(index, "operation must be an object")
+            kind = op.get("op")
+
+            if kind == "create":
+                serializer = TaskSerializer(data=op, context=context)
+                if not serializer.is_valid():
+                    raise BulkOperationError(index, serializer.errors)
+                creates.append(serializer.validated_data)
+                continue
+
+            task = tasks.get(op.get("id"))
+            if task is None:
+                raise BulkOperationError(index, "task not found", 404)
+            is_owner = task.user_id == user.id
+            if "version" in op and op["version"] != task.version:
+                raise BulkOperationError(index, "タスクは他のユーザーによって更新されています。", 409)
+
+            if kind == "update":
+                serializer = TaskSerializer(task, data=op, partial=True, context=context)
+                if not serializer.is_valid():
+                    raise BulkOperationError(index, serializer.errors)
+                validated = {k: v for k, v in serializer.validated_data.items() if k in UPDATABLE_FIELDS}
+                if "title" in validated and not is_owner:
+                    raise BulkOperationError(index, "タスク名を変更できるのは作成者だけです。", 403)
+                for field, value in validated.items():
+                    setattr(task, field, value)
+                changed_fields.update(validated)
+                updates[task.id] = task
+
+            elif kind == "move":
+                new_status = op.get("status")
+                if new_status not in valid_statuses:
+                    raise BulkOperationError(index, "invalid status")
+                try:
+                    new_order = int(op.get("order"))
+                except (TypeError, ValueError):
+                    raise BulkOperationError(index, "invalid order")
+                if not is_owner and not user.is_staff:
+                    raise BulkOperationError(index, "他のユーザーのタスクは移動できません。", 403)
+                if not is_owner and new_status != task.status:
+                    raise BulkOperationError(index, "管理者でも、他のユーザーのタスクを別のカラムへは移動できません。", 403)
+                moves.append((task, new_status, new_order))
+
+            elif kind == "delete":
+                if not is_owner:
+                    raise BulkOperationError(index, "このタスクを削除できるのは作成者だけです。", 403)
+                deletes.append(task)
+
+            else:
+                raise BulkOperationError(index, f"unknown op: {kind}")
+
+        # update（まとめて 1 回）
+        if updates:
+            now = timezone.now()
+            for task in updates.values():
+                task.updated_at = now
+                task.version += 1
+            Task.objects.bulk_update(
+                list(updates.values()), sorted(changed_fields) + ["updated_at", "version"],
+            )
+            result.updated = list(updates.values())
+
+        # move（通常は 1 件につき 1 行の UPDATE）
+        for task, new_status, new_order in moves:
+            result.moved.extend(
+                dict(row, board=task.board_id) for row in place_task(task, new_status, new_order)
+            )
+
+        # create（カラムごとに末尾へ続けて並べ、まとめて 1 回）
+        if creates:
+            offsets = defaultdict(int)
+            new_tasks = []
+            for data in creates:
+                board = data.get("board")
+                column = (board.id if board else None, data.get("status", "todo"))
+                if column not in offsets:
+                    offsets[column] = next_order(column[1], column[0])
+                else:
+                    offsets[column] += ORDER_GAP
+                new_tasks.append(Task(user=user, order=offsets[column], **data))
+            result.created = Task.objects.bulk_create(new_tasks)
+
+        # delete（まとめて 1 回）
+        if deletes:
+            Task.objects.filter(id__in=[t.id for t in deletes]).delete()
+            TaskTombstone.objects.bulk_create(
+                TaskTombstone(task_id=t.id, board_id=t.board_id) for t in deletes
+            )
+            result.deleted = deletes
+
+    return result
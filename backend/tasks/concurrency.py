@@ -0,0 +1,103 @@
+"""
+タスクの楽観的排他制御。
+
+Task.version はタスクを保存するたびに 1 つ進む。クライアントは編集の元にした版を
+If-Match ヘッダー（詳細 API の ETag と同じ "3" の形式）か本文の version で送る。
+保存は UPDATE ... WHERE id = ? AND version = ? の 1 文で行い、その間に他の
+リクエストが保存していれば 0 行になるので VersionConflict（409）にする。
+
+版を送らないクライアントは、リクエストの中で読んだ版を基準にする
+（読んでから書くまでの間に割り込まれた更新だけを検出する）。
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Task, TaskTombstone
+
+
+class VersionConflict(Exception):
+    def __init__(self, task_id):
+        super().__init__(f"task {task_id} was modified concurrently")
+        self.task_id = task_id
+
+
+def task_etag(task):
+    return f'"{task.version}"'
+
+
+def requested_version(request):
+    """If-Match または本文の version（どちらも無ければ None）"""
+    value = request.headers.get("If-Match")
+    if value:
+        value = value.strip()
+        if value == "*":
+            return None
+        if value.startswith("W/"):
+            value = value[2:]
+        value = value.strip('"')
+    else:
+        value = request.data.get("version") if hasattr(request.data, "get") else None
+        if value in (None, ""):
+            return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({"error": "invalid version"})
+
+
+def _update_values(task, fields):
+    values = {}
+    for name in fields:
+        attname = Task._meta.get_field(name).attname
+        values[attname] = getattr(task, attname)
+    return values
+
+
+def save_task(task, fields, expected_version=None):
+    """
+    task の fields を版を確認して保存する（版は 1 つ進む）。
+
+    expected_version を省略すると task.version（読み込んだ時点の版）と比べる。
+    他の保存と競合した場合は VersionConflict を送出する。
+    """
+    if expected_version is None:
+        expected_version = task.version
+    now = timezone.now()
+    updated = Task.objects.filter(pk=task.pk, version=expected_version).update(
+        **_update_values(task, fields), updated_at=now, version=F("version") + 1,
+    )
+    if not updated:
+        raise VersionConflict(task.pk)
+    task.updated_at = now
+    task.version = expected_version + 1
+
+
+async def asave_task(task, fields, expected_version=None):
+    """save_task の非同期版"""
+    if expected_version is None:
+        expected_version = task.version
+    now = timezone.now()
+    updated = await Task.objects.filter(pk=task.pk, version=expected_version).aupdate(
+        **_update_values(task, fields), updated_at=now, version=F("version") + 1,
+    )
+    if not updated:
+        raise VersionConflict(task.pk)
+    task.updated_at = now
+    task.version = expected_version + 1
+
+
+def delete_task(task_id, board_id, expected_version):
+    """
+    版を確認してタスクを削除し、差分同期用の削除の記録を残す。
+
+    競合した場合は何も変更せず VersionConflict を送出する。
+    """
+    with transaction.atomic(savepoint=False):
+        deleted, _ = Task.objects.filter(pk=task_id, version=expected_version).delete()
+        if deleted:
+            # 差分同期のクライアントに削除を伝えるための記録
+            TaskTombstone.objects.create(task_id=task_id, board_id=board_id)
+    if not deleted:
+        raise VersionConflict(task_id)
@@ -1,8 +1,15 @@
 import json
 import asyncio
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 import logging
 
+from django.conf import settings
+
+from tasks import metrics
+from tasks.events import BOARD_GROUP, FRAME_ENCODINGS, board_group, call_event_log, compressed_frame
+from tasks.outbound import OutboundQueue
+
 logger = logging.getLogger(__name__)
 
 class TaskConsumer(AsyncWebsocketConsumer):
@@ -10,8 +17,18 @@ class TaskConsumer(AsyncWebsocketConsumer):
         #  下位互換性: URL認証（旧方式）とメッセージ認証（新方式）の両方をサポート
         self.authenticated = False
         self.user = None
-        self.group_name = "tasks_all"
+        self.group_name = BOARD_GROUP
+        # 参加中のグループ（共有ボード + subscribe したボード）
+        self.groups = set()
         self.auth_timeout_task = None
+        # 配信イベントの送り方（auth メッセージの encoding で zlib を選べる）
+        self.encoding = "json"
+
+        # 📤 配信イベントは接続ごとの送信キュー経由で送る（遅いクライアント対策）
+        self.outbound = OutboundQueue(
+            self._send_frame,
+            maxsize=getattr(settings, "WS_OUTBOUND_QUEUE_SIZE", 256),
+        )
         
         #  旧方式: URLパラメータからのトークン認証（下位互換性のため残す）
         query_string = self.scope.get('query_string', b'').decode()
@@ -26,26 +43,33 @@ class TaskConsumer(AsyncWebsocketConsumer):
             if not user.is_anonymous:
                 self.authenticated = True
                 self.user = user
-                await self.channel_layer.group_add(
-                    self.group_name,
-                    self.channel_name
-                )
+                await self._join(self.group_name)
                 await self.accept()
+                self._opened()
+                self.outbound.start()
                 logger.info(f"WebSocket authenticated (legacy URL auth) - User: {user.username}")
                 return
         
         # 🆕 新方式: 接続を許可し、メッセージで認証を待つ
         await self.accept()
+        self._opened()
+        self.outbound.start()
         logger.info("WebSocket connection accepted - awaiting authentication message")
         
         # ⏱️ 5秒以内に認証しなければ切断
         self.auth_timeout_task = asyncio.create_task(self._auth_timeout())
     
+    def _opened(self):
+        """📊 開いている接続数（disconnect で減らす）"""
+        self.is_open = True
+        metrics.WS_CONNECTIONS.inc()
+
     async def _auth_timeout(self):
         """認証タイムアウト処理（5秒）"""
         await asyncio.sleep(5)
         if not self.authenticated:
             logger.warning("WebSocket authentication timeout - closing connection")
+            metrics.WS_AUTH_FAILURES.inc(reason="timeout")
             await self.send(text_data=json.dumps({
                 "type": "error",
                 "message": "認証タイムアウト"
@@ -60,7 +84,7 @@ class TaskConsumer(AsyncWebsocketConsumer):
             
             # 📝 認証メッセージの処理
             if msg_type == 'auth':
-                await self._handle_auth(data.get('token'))
+                await self._handle_auth(data.get('token'), data.get('encoding'))
                 return
             
             # 🔒 認証済みでないと他のメッセージは処理しない
@@ -72,16 +96,30 @@ class TaskConsumer(AsyncWebsocketConsumer):
                 }))
                 return
             
+            # 🔁 再接続時の差分同期
+            if msg_type == 'resume':
+                await self._handle_resume(data.get('since'), data.get('boards') or [])
+                return
+
+            # 📋 ボードの購読・購読解除
+            if msg_type == 'subscribe':
+                await self._handle_subscribe(data.get('board'))
+                return
+            if msg_type == 'unsubscribe':
+                await self._handle_unsubscribe(data.get('board'))
+                return
+
             # ここに他のメッセージタイプの処理を追加可能
             logger.info(f"Received message type: {msg_type}")
             
         except json.JSONDecodeError:
             logger.error("Invalid JSON received")
     
-    async def _handle_auth(self, token):
-        """認証処理"""
+    async def _handle_auth(self, token, encoding=None):
+        """認証処理（encoding: "zlib" なら大きなイベントを圧縮したバイナリフレームで送る）"""
         if not token:
             logger.warning("Authentication failed - no token provided")
+            metrics.WS_AUTH_FAILURES.inc(reason="missing_token")
             await self.send(text_data=json.dumps({
                 "type": "error",
                 "message": "トークンが必要です"
@@ -95,6 +133,7 @@ class TaskConsumer(AsyncWebsocketConsumer):
         
         if user.is_anonymous:
             logger.warning("Authentication failed - invalid token")
+            metrics.WS_AUTH_FAILURES.inc(reason="invalid_token")
             await self.send(text_data=json.dumps({
                 "type": "error",
                 "message": "認証に失敗しました"
@@ -105,61 +144,204 @@ class TaskConsumer(AsyncWebsocketConsumer):
         # ✅ 認証成功
         self.authenticated = True
         self.user = user
+        if encoding in FRAME_ENCODINGS:
+            self.encoding = encoding
         
         # タイムアウトタスクをキャンセル
         if self.auth_timeout_task:
             self.auth_timeout_task.cancel()
         
         # グループに追加
-        await self.channel_layer.group_add(
-            self.group_name,
-            self.channel_name
-        )
+        await self._join(self.group_name)
         
         logger.info(f"WebSocket authenticated - User: {user.username} (ID: {user.id})")
         
         await self.send(text_data=json.dumps({
             "type": "authenticated",
-            "message": f"認証成功: {user.username}"
+            "message": f"認証成功: {user.username}",
+            "revision": await call_event_log("current_revision"),
+            "encoding": self.encoding,
+        }))
+
+    async def _handle_resume(self, since, boards):
+        """
+        since より後のイベントを再送する。ログに残っていなければ全件取り直しを要求。
+
+        boards を渡すと再送の前にそのボードを購読し直す。購読していないが
+        メンバーになっているボードのイベントがあった場合も全件取り直しを要求する。
+        """
+        try:
+            since = int(since)
+            board_ids = [int(b) for b in boards]
+        except (TypeError, ValueError):
+            await self.send(text_data=json.dumps({
+                "type": "error",
+                "message": "since が不正です"
+            }))
+            return
+
+        for board_id in board_ids:
+            if await self._can_subscribe(board_id):
+                await self._join(board_group(board_id))
+
+        events = await call_event_log("since", since)
+        if events is not None:
+            missed = {event.get("group", BOARD_GROUP) for event in events} - self.groups
+            if missed and await self._is_member_of_any(missed):
+                events = None
+
+        if events is None:
+            await self.send(text_data=json.dumps({
+                "type": "resnapshot",
+                "revision": await call_event_log("current_revision"),
+            }))
+            return
+
+        for event in events:
+            # 購読中のボードのイベントだけを再送する
+            if event.get("group", BOARD_GROUP) in self.groups:
+                self._forward(event)
+
+        # 再送の終わり（クライアントはそれまでに届いたライブイベントと合わせて適用する）
+        self.outbound.put(json.dumps({
+            "type": "resumed",
+            "revision": events[-1]["revision"] if events else since,
         }))
 
+    async def _handle_subscribe(self, board_id):
+        """ボードのイベントの受信を開始する（メンバーのみ）"""
+        try:
+            board_id = int(board_id)
+        except (TypeError, ValueError):
+            await self.send(text_data=json.dumps({
+                "type": "error",
+                "message": "board が不正です"
+            }))
+            return
+
+        if not await self._can_subscribe(board_id):
+            logger.warning(f"Subscribe denied - User: {self.user.username}, Board: {board_id}")
+            await self.send(text_data=json.dumps({
+                "type": "error",
+                "message": "このボードを購読する権限がありません"
+            }))
+            return
+
+        await self._join(board_group(board_id))
+        await self.send(text_data=json.dumps({
+            "type": "subscribed",
+            "board": board_id,
+        }))
+
+    async def _handle_unsubscribe(self, board_id):
+        """ボードのイベントの受信を停止する"""
+        try:
+            group = board_group(int(board_id))
+        except (TypeError, ValueError):
+            return
+        if group in self.groups:
+            self.groups.discard(group)
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await self.send(text_data=json.dumps({
+            "type": "unsubscribed",
+            "board": int(board_id),
+        }))
+
+    @database_sync_to_async
+    def _can_subscribe(self, board_id):
+        from tasks.models import Board
+
+        boards = Board.objects.filter(id=board_id)
+        if not self.user.is_staff:
+            boards = boards.filter(members=self.user)
+        return boards.exists()
+
+    @database_sync_to_async
+    def _is_member_of_any(self, groups):
+        """groups（board_<id>）の中にユーザーが閲覧できるボードがあるか"""
+        from tasks.models import Board
+
+        board_ids = [int(g[len("board_"):]) for g in groups if g.startswith("board_")]
+        boards = Board.objects.filter(id__in=board_ids)
+        if not self.user.is_staff:
+            boards = boards.filter(members=self.user)
+        return boards.exists()
+
+    async def _join(self, group):
+        self.groups.add(group)
+        await self.channel_layer.group_add(group, self.channel_name)
+
+    async def _send_frame(self, frame):
+        if isinstance(frame, bytes):
+            # 🗜️ zlib で圧縮した JSON
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
+
+    def _forward(self, event):
+        """エンコード済みの配信メッセージを送信キューに積む（同じタスクの未送信の更新は上書き）"""
+        key = event.get("key")
+        frame = compressed_frame(event) if self.encoding == "zlib" else event["text"]
+        self.outbound.put(frame, key=tuple(key) if key else None)
+
     async def disconnect(self, close_code):
         # タイムアウトタスクをキャンセル
         if hasattr(self, 'auth_timeout_task') and self.auth_timeout_task:
             self.auth_timeout_task.cancel()
         
+        if hasattr(self, 'outbound'):
+            await self.outbound.stop()
+
+        if getattr(self, 'is_open', False):
+            self.is_open = False
+            metrics.WS_CONNECTIONS.dec()
+
         # グループから削除（認証済みの場合のみ）
-        if self.authenticated and hasattr(self, 'group_name'):
-            await self.channel_layer.group_discard(
-                self.group_name,
-                self.channel_name
-            )
+        if self.authenticated and hasattr(self, 'groups'):
+            for group in self.groups:
+                await self.channel_layer.group_discard(group, self.channel_name)
             logger.info(f"WebSocket disconnected - User: {self.user.username if self.user else 'Unknown'}")
 
     # =========================
     # 単体更新
     # =========================
     async def task_update(self, event):
-        await self.send(text_data=json.dumps({
-            "type": "task_update",
-            "task": event["task"]
-        }))
+        self._forward(event)
 
     # =========================
     # 削除
     # =========================
     async def task_delete(self, event):
-        await self.send(text_data=json.dumps({
-            "type": "task_delete",
-            "task_id": event["task_id"]
-        }))
+        self._forward(event)
 
     # =========================
-    # 並び替え（全件同期）
+    # 並び替え（差分: id, status, order のみ）
+    # =========================
+    async def task_move(self, event):
+        self._forward(event)
+
+    # =========================
+    # 全件同期（フォールバック）
     # =========================
     async def task_bulk_update(self, event):
-        await self.send(text_data=json.dumps({
-            "type": "task_bulk_update",
-            "tasks": event["tasks"]
-        }))
+        self._forward(event)
+
+    # =========================
+    # まとめて配信（一括操作など）
+    # =========================
+    async def task_batch(self, event):
+        self._forward(event)
 
+    # =========================
+    # ボードのメンバー変更・削除（メンバーでなくなったら購読をやめる）
+    # =========================
+    async def board_members_changed(self, event):
+        group = board_group(event["board"])
+        if group not in self.groups or await self._can_subscribe(event["board"]):
+            return
+        self.groups.discard(group)
+        await self.channel_layer.group_discard(group, self.channel_name)
+        self.outbound.put(json.dumps({
+            "type": "unsubscribed",
+            "board": event["board"],
+        }))
@@ -0,0 +1,242 @@
+"""
+ボードのイベントログ。
+
+WebSocket へ配信するイベントには単調増加するボードのリビジョン番号を付け、
+直近のイベントを一定件数だけ保持する。再接続したクライアントは
+{"type": "resume", "since": N} を送ると N より後のイベントだけを受け取れる。
+保持範囲より古いリビジョンを指定された場合は全件を取り直してもらう。
+
+配信するイベントは送信前に一度だけ JSON にエンコードし（orjson があれば使う）、
+consumer はそのテキストを各クライアントへそのまま転送する。
+auth メッセージで encoding: "zlib" を選んだクライアントには、大きなイベント
+（ボードの全件同期など）を zlib で圧縮した JSON のバイナリフレームで送る。
+
+デフォルトはプロセス内のメモリに保持する。複数プロセスで動かす場合は
+TASK_EVENT_LOG_REDIS_URL を設定すると Redis に保持する（redis パッケージが必要）。
+"""
+import json
+import threading
+import zlib
+from collections import OrderedDict, deque
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson は任意
+    orjson = None
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from . import metrics
+from .outbound import coalesce_key
+
+# 全クライアントが参加するグループ（ボードに属さないタスク用）
+BOARD_GROUP = "tasks_all"
+
+
+def board_group(board_id):
+    """ボードのイベントを配信するグループ名"""
+    if board_id is None:
+        return BOARD_GROUP
+    return f"board_{board_id}"
+
+
+class InMemoryEventLog:
+    """プロセス内に直近のイベントを保持するログ"""
+
+    # 呼び出しがネットワーク I/O を伴うか（非同期コードからはスレッド経由で呼ぶ）
+    blocking = False
+
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self._events = deque(maxlen=maxlen)
+        self._revision = 0
+        self._lock = threading.Lock()
+
+    def append(self, event, wrap=None):
+        """
+        イベントにリビジョンを付けて記録し、記録した内容を返す。
+
+        wrap を渡すとリビジョン付与後のイベントを変換したものを記録する。
+        """
+        with self._lock:
+            self._revision += 1
+            stamped = {**event, "revision": self._revision}
+            record = wrap(stamped) if wrap else stamped
+            self._events.append(record)
+        return record
+
+    def current_revision(self):
+        return self._revision
+
+    def since(self, revision):
+        """
+        revision より後のイベントを古い順に返す。
+
+        ログから既に消えたイベントが含まれる場合は None を返す。
+        """
+        with self._lock:
+            if revision > self._revision:
+                # サーバー再起動などでリビジョンが巻き戻っている
+                return None
+            if revision == self._revision:
+                return []
+            if not self._events or self._events[0]["revision"] > revision + 1:
+                return None
+            return [e for e in self._events if e["revision"] > revision]
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._revision = 0
+
+
+class RedisEventLog:
+    """Redis に直近のイベントを保持するログ（複数プロセス用）"""
+
+    blocking = True
+
+    def __init__(self, url, maxlen, prefix="tasks:events"):
+        import redis
+
+        self.maxlen = maxlen
+        self._redis = redis.Redis.from_url(url)
+        self._revision_key = f"{prefix}:revision"
+        self._events_key = f"{prefix}:log"
+
+    def append(self, event, wrap=None):
+        revision = self._redis.incr(self._revision_key)
+        stamped = {**event, "revision": revision}
+        record = wrap(stamped) if wrap else stamped
+        pipe = self._redis.pipeline()
+        pipe.zadd(self._events_key, {json.dumps(record): revision})
+        pipe.zremrangebyrank(self._events_key, 0, -self.maxlen - 1)
+        pipe.execute()
+        return record
+
+    def current_revision(self):
+        return int(self._redis.get(self._revision_key) or 0)
+
+    def since(self, revision):
+        # 途中で古いイベントが削られても気付けるよう、1 つのトランザクションで読む
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.get(self._revision_key)
+        pipe.zrange(self._events_key, 0, 0, withscores=True)
+        pipe.zrangebyscore(self._events_key, f"({revision}", "+inf")
+        current, oldest, raw = pipe.execute()
+
+        current = int(current or 0)
+        if revision > current:
+            return None
+        if revision == current:
+            return []
+        if not oldest or int(oldest[0][1]) > revision + 1:
+            return None
+        return [json.loads(e) for e in raw]
+
+    def clear(self):
+        self._redis.delete(self._revision_key, self._events_key)
+
+
+_event_log = None
+
+
+def get_event_log():
+    """設定に応じたイベントログ（プロセス内で共有）"""
+    global _event_log
+    if _event_log is None:
+        maxlen = getattr(settings, "TASK_EVENT_LOG_MAXLEN", 1000)
+        redis_url = getattr(settings, "TASK_EVENT_LOG_REDIS_URL", None)
+        if redis_url:
+            _event_log = RedisEventLog(redis_url, maxlen)
+        else:
+            _event_log = InMemoryEventLog(maxlen)
+    return _event_log
+
+
+async def call_event_log(method, *args):
+    """非同期コードからイベントログのメソッドを呼ぶ"""
+    log = get_event_log()
+    func = getattr(log, method)
+    if log.blocking:
+        return await sync_to_async(func, thread_sensitive=False)(*args)
+    return func(*args)
+
+
+def encode_message(message):
+    """クライアントへ送る JSON テキスト"""
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+# クライアントが auth メッセージの encoding で選べる形式
+FRAME_ENCODINGS = ("json", "zlib")
+
+# zlib 形式で圧縮したフレーム（同じイベントはプロセス内で 1 回だけ圧縮する）
+_compressed_frames = OrderedDict()
+_compressed_lock = threading.Lock()
+COMPRESSED_CACHE_SIZE = 64
+
+
+def compressed_frame(message):
+    """
+    zlib を選んだクライアントへ送るフレーム。
+
+    WS_COMPRESS_MIN_BYTES 以上のテキストは zlib で圧縮した JSON のバイナリフレーム、
+    それより小さいものは圧縮しても得にならないのでテキストのまま返す。
+    """
+    text = message["text"]
+    if len(text) < getattr(settings, "WS_COMPRESS_MIN_BYTES", 1024):
+        return text
+
+    # 購読者ごとに届くのは同じ内容のテキストなので、テキストをそのままキーにする
+    with _compressed_lock:
+        frame = _compressed_frames.get(text)
+        if frame is not None:
+            _compressed_frames.move_to_end(text)
+            return frame
+
+    frame = zlib.compress(text.encode(), getattr(settings, "WS_COMPRESS_LEVEL", 6))
+    with _compressed_lock:
+        _compressed_frames[text] = frame
+        while len(_compressed_frames) > COMPRESSED_CACHE_SIZE:
+            _compressed_frames.popitem(last=False)
+    return frame
+
+
+def wire_message(stamped, group=BOARD_GROUP):
+    """
+    チャンネルレイヤーに流す形式。
+
+    本文はエンコード済みの text だけを持つので、購読者ごとのコピーや
+    再エンコードが発生しない。key は送信キューでの上書き判定に、
+    group は resume で購読中のボードのイベントだけを再送するのに使う。
+    """
+    key = coalesce_key(stamped, group)
+    return {
+        "type": stamped["type"],
+        "revision": stamped["revision"],
+        "group": group,
+        "key": list(key) if key else None,
+        "text": encode_message(stamped),
+    }
+
+
+def publish_event(event, group=BOARD_GROUP):
+    """イベントにリビジョンを付けてログに記録し、エンコード済みの形でグループへ配信する"""
+    message = get_event_log().append(event, wrap=lambda stamped: wire_message(stamped, group))
+    channel_layer = get_channel_layer()
+    with metrics.GROUP_SEND_SECONDS.time():
+        async_to_sync(channel_layer.group_send)(group, message)
+    return message
+
+
+async def apublish_event(event, group=BOARD_GROUP):
+    """publish_event の非同期版（group_send をそのまま await する）"""
+    message = await call_event_log("append", event, lambda stamped: wire_message(stamped, group))
+    channel_layer = get_channel_layer()
+    with metrics.GROUP_SEND_SECONDS.time():
+        await channel_layer.group_send(group, message)
+    return message
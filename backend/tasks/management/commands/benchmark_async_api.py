@@ -0,0 +1,137 @@
+import asyncio
+import json
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tasks.management.commands.benchmark_websocket_fanout import percentile
+
+BENCH_USERNAME = '__bench_api__'
+
+APIS = {
+    'sync': '/api/tasks/',
+    'async': '/api/async/tasks/',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the sync (/api/tasks/) and async (/api/async/tasks/) task APIs through '
+        'core.asgi.application with concurrent clients and compare latency and throughput'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16, help='Concurrent HTTP clients')
+        parser.add_argument('--requests', type=int, default=400, help='Requests per API')
+        parser.add_argument(
+            '--mix', default='list=0.4,create=0.2,update=0.3,reorder=0.1',
+            help='Request mix as op=weight pairs (list, create, update, reorder)',
+        )
+        parser.add_argument('--api', choices=['both', *APIS], default='both', help='Which API to benchmark')
+        parser.add_argument('--host', default='localhost', help='Host header (must be in ALLOWED_HOSTS)')
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        token = str(AccessToken.for_user(user))
+        apis = list(APIS) if options['api'] == 'both' else [options['api']]
+        if connection.vendor == 'sqlite' and options['clients'] > 1:
+            self.stdout.write(self.style.WARNING(
+                'SQLite serialises writes - numbers mostly reflect lock waits, use PostgreSQL for a fair comparison'
+            ))
+
+        results = {}
+        try:
+            for api in apis:
+                user.tasks.all().delete()
+                results[api] = asyncio.run(self.run(APIS[api], token, options))
+        finally:
+            user.delete()
+
+        self.report(results, options)
+
+    def parse_mix(self, mix):
+        weights = {}
+        for part in mix.split(','):
+            op, _, weight = part.partition('=')
+            if op not in ('list', 'create', 'update', 'reorder'):
+                raise ValueError(f'unknown op in --mix: {op}')
+            weights[op] = float(weight or 1)
+        return list(weights), list(weights.values())
+
+    async def run(self, base, token, options):
+        from channels.testing import HttpCommunicator
+        from core.asgi import application
+
+        host = options['host'].encode()
+        ops, weights = self.parse_mix(options['mix'])
+        latencies = {op: [] for op in ops}
+        errors = 0
+
+        async def request(method, path, body=None):
+            payload = json.dumps(body).encode() if body is not None else b''
+            communicator = HttpCommunicator(
+                application, method, path,
+                body=payload,
+                headers=[
+                    (b'host', host),
+                    (b'authorization', f'Bearer {token}'.encode()),
+                    (b'content-type', b'application/json'),
+                    (b'content-length', str(len(payload)).encode()),
+                ],
+            )
+            response = await communicator.get_response(timeout=30)
+            # 応答の後始末（request_finished など）が終わるまで待つ
+            await communicator.wait(timeout=30)
+            return response['status'], json.loads(response['body'] or b'null')
+
+        # 更新・並び替えの対象を先に作っておく
+        task_ids = []
+        for i in range(20):
+            _, body = await request('POST', base, {'title': f'seed {i}', 'status': 'todo'})
+            task_ids.append(body['id'])
+
+        counter = iter(range(options['requests']))
+
+        async def client():
+            nonlocal errors
+            for seq in counter:
+                op = random.choices(ops, weights)[0]
+                started = time.perf_counter()
+                if op == 'list':
+                    status, _ = await request('GET', base)
+                elif op == 'create':
+                    status, body = await request('POST', base, {'title': f'bench {seq}', 'status': 'todo'})
+                    if status == 201:
+                        task_ids.append(body['id'])
+                elif op == 'update':
+                    status, _ = await request('PATCH', f'{base}{random.choice(task_ids)}/', {'title': f'bench {seq}'})
+                else:
+                    status, _ = await request('POST', f'{base}reorder/', {
+                        'task_id': random.choice(task_ids),
+                        'status': random.choice(['todo', 'in_progress', 'done']),
+                        'order': random.randint(0, 10),
+                    })
+                latencies[op].append(time.perf_counter() - started)
+                if status >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['clients'])))
+        return {'elapsed': time.perf_counter() - started, 'latencies': latencies, 'errors': errors}
+
+    def report(self, results, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\nTask API ({options["clients"]} clients, {options["requests"]} requests per API)'
+        ))
+        for api, stats in results.items():
+            total = sum(len(l) for l in stats['latencies'].values())
+            self.stdout.write(f'  {api:<6} {total / stats["elapsed"]:.0f} req/s, {stats["errors"]} errors')
+            for op, samples in stats['latencies'].items():
+                ms = [l * 1000 for l in samples]
+                self.stdout.write(
+                    f'    {op:<8} p50 {percentile(ms, 50):6.1f} ms / p99 {percentile(ms, 99):6.1f} ms ({len(ms)} requests)'
+                )
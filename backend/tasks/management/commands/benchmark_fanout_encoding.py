@@ -0,0 +1,76 @@
+import copy
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks import events
+
+
+class Command(BaseCommand):
+    help = 'Compare per-subscriber JSON encoding with pre-encoded broadcast payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=500, help='Tasks in the simulated board snapshot')
+        parser.add_argument('--subscribers', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        board = [
+            {
+                'id': i,
+                'title': f'タスク {i}',
+                'description': 'lorem ipsum ' * 20,
+                'status': 'todo',
+                'order': (i + 1) * 1024,
+                'username': 'user1',
+                'created_at': '2026-01-01T00:00:00Z',
+                'updated_at': '2026-01-01T00:00:00Z',
+            }
+            for i in range(options['tasks'])
+        ]
+        event = {'type': 'task_bulk_update', 'tasks': board, 'revision': 1}
+
+        encoders = [('json', self.encode_json)]
+        if events.orjson is not None:
+            encoders.append(('orjson', lambda m: events.orjson.dumps(m).decode()))
+        else:
+            self.stdout.write(self.style.WARNING('orjson is not installed - only the json module is measured'))
+
+        self.stdout.write(f'Board: {len(board)} tasks, {len(self.encode_json(event)) / 1024:.0f} KiB per snapshot\n')
+        self.stdout.write(f'{"subscribers":>11}  {"encoder":<7}  {"per-socket encode":>18}  {"pre-encoded":>12}  {"speedup":>8}')
+
+        for subscribers in options['subscribers']:
+            for name, encode in encoders:
+                before = self.measure(lambda: self.per_subscriber(event, subscribers, encode), options['repeat'])
+                after = self.measure(lambda: self.pre_encoded(event, subscribers, encode), options['repeat'])
+                self.stdout.write(
+                    f'{subscribers:>11}  {name:<7}  {before * 1000:>15.1f} ms  {after * 1000:>9.1f} ms  {before / after:>7.1f}x'
+                )
+
+    @staticmethod
+    def encode_json(message):
+        return json.dumps(message, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def per_subscriber(event, subscribers, encode):
+        # 従来: チャンネルレイヤーが購読者ごとに dict をコピーし、consumer が毎回エンコードする
+        for _ in range(subscribers):
+            encode(copy.deepcopy(event))
+
+    @staticmethod
+    def pre_encoded(event, subscribers, encode):
+        # 現在: 一度だけエンコードし、購読者ごとのコピーは文字列 1 つだけ
+        wire = {'type': event['type'], 'revision': event['revision'], 'key': None, 'text': encode(event)}
+        for _ in range(subscribers):
+            copy.deepcopy(wire)['text']
+
+    @staticmethod
+    def measure(func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,88 @@
+import random
+import time
+import zlib
+
+from django.core.management.base import BaseCommand
+
+from tasks.events import encode_message
+
+WORDS = (
+    'タスク 確認 修正 レビュー 対応 資料 会議 準備 デプロイ 調査 設計 テスト '
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Compare frame size and CPU of plain JSON text frames with zlib-compressed binary frames'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, nargs='+', default=[10, 100, 500], help='Tasks per board snapshot')
+        parser.add_argument('--description', type=int, default=400, help='Average description length in characters')
+        parser.add_argument('--levels', type=int, nargs='+', default=[1, 6, 9], help='zlib levels to measure')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        try:
+            import msgpack
+        except ImportError:
+            msgpack = None
+            self.stdout.write(self.style.WARNING('msgpack is not installed - only JSON and zlib are measured'))
+
+        self.stdout.write(
+            f'{"tasks":>6}  {"format":<10}  {"size":>10}  {"ratio":>6}  {"encode":>10}  {"decode":>10}'
+        )
+        for count in options['tasks']:
+            event = {'type': 'task_bulk_update', 'tasks': self.board(count, options['description']), 'revision': 1}
+            text = encode_message(event).encode()
+            self.row(count, 'json', len(text), len(text), 0, 0)
+
+            for level in options['levels']:
+                frame = zlib.compress(text, level)
+                encode = self.measure(lambda: zlib.compress(text, level), options['repeat'])
+                decode = self.measure(lambda: zlib.decompress(frame), options['repeat'])
+                self.row(count, f'zlib -{level}', len(frame), len(text), encode, decode)
+
+            if msgpack is not None:
+                packed = msgpack.packb(event)
+                encode = self.measure(lambda: msgpack.packb(event), options['repeat'])
+                decode = self.measure(lambda: msgpack.unpackb(packed), options['repeat'])
+                self.row(count, 'msgpack', len(packed), len(text), encode, decode)
+
+        self.stdout.write(
+            '\nencode is paid once per event per process (frames are cached by content); '
+            'decode is paid by every client.'
+        )
+
+    def board(self, count, description):
+        return [
+            {
+                'id': i,
+                'title': f'タスク {i}',
+                'description': ' '.join(random.choices(WORDS, k=max(1, description // 6))),
+                'board': None,
+                'status': random.choice(['todo', 'in_progress', 'done']),
+                'order': (i + 1) * 1024,
+                'version': 1,
+                'username': f'user{i % 7}',
+                'created_at': '2026-01-01T00:00:00Z',
+                'updated_at': '2026-01-01T00:00:00Z',
+            }
+            for i in range(count)
+        ]
+
+    def row(self, count, name, size, plain, encode, decode):
+        self.stdout.write(
+            f'{count:>6}  {name:<10}  {size / 1024:>7.1f} KiB  {plain / size:>5.1f}x  '
+            f'{encode * 1000:>7.2f} ms  {decode * 1000:>7.2f} ms'
+        )
+
+    @staticmethod
+    def measure(func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
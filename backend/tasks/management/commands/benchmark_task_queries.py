@@ -0,0 +1,93 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.ordering import ORDER_GAP
+
+BENCH_USERNAME = '__bench__'
+
+
+class Command(BaseCommand):
+    help = 'Seed a large board and report EXPLAIN plans and timings for the TaskViewSet queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100_000, help='Number of tasks to seed')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query (median is reported)')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded tasks afterwards')
+        parser.add_argument('--no-explain', action='store_true', help='Only print timings')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Database: {connection.vendor}')
+        user = self.seed(options['tasks'])
+
+        try:
+            for name, build in self.queries():
+                self.run_query(name, build, options['repeat'], not options['no_explain'])
+        finally:
+            if not options['keep']:
+                user.delete()
+                self.stdout.write('Seeded tasks removed')
+
+    def seed(self, count):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        Task.objects.filter(user=user).delete()
+
+        statuses = [s[0] for s in Task.STATUS_CHOICES]
+        started = time.perf_counter()
+        batch = []
+        for i in range(count):
+            status = statuses[i % len(statuses)]
+            batch.append(Task(user=user, title=f'bench {i}', status=status, order=(i // len(statuses) + 1) * ORDER_GAP))
+            if len(batch) == 5000:
+                Task.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Task.objects.bulk_create(batch)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE tasks_task')
+        elif connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Seeded {count} tasks in {time.perf_counter() - started:.2f}s'))
+        return user
+
+    def queries(self):
+        """TaskViewSet / tasks.ordering が発行するクエリ"""
+        since = timezone.now() - timedelta(minutes=5)
+        middle = Task.objects.filter(status='todo').order_by('order', 'id').values_list('order', flat=True)
+
+        return [
+            ('list (full board)', lambda: Task.objects.select_related('user').order_by('status', 'order', 'id')),
+            ('list page (?limit=100)', lambda: Task.objects.select_related('user').order_by('status', 'order', 'id')[:101]),
+            ('column (?status=todo)', lambda: Task.objects.select_related('user').filter(status='todo').order_by('status', 'order', 'id')),
+            ('reorder neighbours', lambda: middle[999:1001]),
+            ('append rank (Max order)', lambda: Task.objects.filter(status='todo').aggregate(last=Max('order'))),
+            ('changes since', lambda: Task.objects.filter(updated_at__gt=since).order_by('updated_at')),
+        ]
+
+    def run_query(self, name, build, repeat, explain):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = build()
+            if hasattr(result, '__iter__') and not isinstance(result, dict):
+                list(result)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+        self.stdout.write(f'  median {statistics.median(timings):.2f} ms / min {min(timings):.2f} ms')
+
+        query = build()
+        if explain and hasattr(query, 'explain'):
+            for line in query.explain().splitlines():
+                self.stdout.write(f'    {line}')
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+BENCH_USERNAME = '__bench_ws__'
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Open N authenticated WebSocket clients against core.asgi.application in-process, '
+        'drive writes through the REST API and report delivery latency, throughput and memory'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100, help='Concurrent WebSocket clients')
+        parser.add_argument('--writes', type=int, default=200, help='REST writes to perform')
+        parser.add_argument('--writers', type=int, default=4, help='Concurrent REST writers')
+        parser.add_argument(
+            '--mix', default='create=0.4,update=0.4,reorder=0.2',
+            help='Write mix as op=weight pairs (create, update, reorder)',
+        )
+        parser.add_argument('--drain', type=float, default=10.0, help='Seconds to wait for deliveries after the last write')
+        parser.add_argument('--origin', default=None, help='Origin header for the socket handshake (default: first ALLOWED_HOSTS entry)')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark tasks afterwards')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and options['writers'] > 1:
+            # SQLite は同時に 1 つしか書き込めず、並列の書き込みは database is locked になる
+            self.stdout.write(self.style.WARNING('SQLite does not support concurrent writers - using --writers 1'))
+            options['writers'] = 1
+
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        user.tasks.all().delete()
+        token = str(AccessToken.for_user(user))
+
+        try:
+            stats = asyncio.run(self.run(token, options))
+        finally:
+            if not options['keep']:
+                user.delete()
+
+        self.report(stats, options)
+
+    def parse_mix(self, mix):
+        weights = {}
+        for part in mix.split(','):
+            op, _, weight = part.partition('=')
+            if op not in ('create', 'update', 'reorder'):
+                raise ValueError(f'unknown op in --mix: {op}')
+            weights[op] = float(weight or 1)
+        return list(weights), list(weights.values())
+
+    def host(self, options):
+        if options['origin']:
+            return options['origin']
+        hosts = [h for h in settings.ALLOWED_HOSTS if h not in ('*', '')]
+        return hosts[0].lstrip('.') if hosts else 'localhost'
+
+    async def run(self, token, options):
+        from channels.testing import HttpCommunicator, WebsocketCommunicator
+        from core.asgi import application
+
+        host = self.host(options)
+        ops, weights = self.parse_mix(options['mix'])
+        sent_at = {}
+        latencies = []
+        received = 0
+        last_received_at = [None]
+
+        # 📡 クライアントを開く（メモリはソケット数で割って接続あたりを出す）
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        clients = []
+        for _ in range(options['clients']):
+            communicator = WebsocketCommunicator(
+                application, '/ws/tasks/',
+                headers=[(b'origin', f'http://{host}'.encode()), (b'host', host.encode())],
+            )
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise RuntimeError('WebSocket handshake was rejected - check --origin / ALLOWED_HOSTS')
+            await communicator.send_json_to({'type': 'auth', 'token': token})
+            reply = await communicator.receive_json_from(timeout=5)
+            if reply.get('type') != 'authenticated':
+                raise RuntimeError(f'authentication failed: {reply}')
+            clients.append(communicator)
+        per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / max(1, len(clients))
+        tracemalloc.stop()
+
+        def observe(event, now):
+            if event['type'] == 'task_batch':
+                for sub in event['events']:
+                    observe(sub, now)
+                return
+            if event['type'] == 'task_update':
+                keys = [('title', event['task']['title'])]
+            elif event['type'] == 'task_move':
+                keys = [('move', row['id'], row['status']) for row in event['tasks']]
+            else:
+                return
+            for key in keys:
+                started = sent_at.get(key)
+                if started is not None:
+                    latencies.append(now - started)
+
+        async def read(communicator):
+            nonlocal received
+            while True:
+                # タイムアウトすると接続ごと終了してしまうので長めに待ち、終了時はキャンセルする
+                text = await communicator.receive_from(timeout=3600)
+                received += 1
+                last_received_at[0] = time.perf_counter()
+                observe(json.loads(text), last_received_at[0])
+
+        async def request(method, path, body=None):
+            payload = json.dumps(body).encode() if body is not None else b''
+            communicator = HttpCommunicator(
+                application, method, path,
+                body=payload,
+                headers=[
+                    (b'host', host.encode()),
+                    (b'authorization', f'Bearer {token}'.encode()),
+                    (b'content-type', b'application/json'),
+                    (b'content-length', str(len(payload)).encode()),
+                ],
+            )
+            response = await communicator.get_response(timeout=30)
+            # 応答の後始末（request_finished など）が終わるまで待つ
+            await communicator.wait(timeout=30)
+            return response['status'], json.loads(response['body'] or b'null')
+
+        task_ids = []
+        statuses = ['todo', 'in_progress', 'done']
+        counter = iter(range(options['writes']))
+
+        async def write():
+            for seq in counter:
+                op = random.choices(ops, weights)[0] if task_ids else 'create'
+                if op == 'create':
+                    title = f'bench {seq}'
+                    sent_at[('title', title)] = time.perf_counter()
+                    status, body = await request('POST', '/api/tasks/', {'title': title, 'status': 'todo'})
+                    if status == 201:
+                        task_ids.append(body['id'])
+                elif op == 'update':
+                    task_id = random.choice(task_ids)
+                    title = f'bench {seq}'
+                    sent_at[('title', title)] = time.perf_counter()
+                    await request('PATCH', f'/api/tasks/{task_id}/', {'title': title})
+                else:
+                    task_id = random.choice(task_ids)
+                    target = random.choice(statuses)
+                    sent_at[('move', task_id, target)] = time.perf_counter()
+                    await request('POST', '/api/tasks/reorder/', {'task_id': task_id, 'status': target, 'order': 0})
+
+        readers = [asyncio.create_task(read(c)) for c in clients]
+        started = time.perf_counter()
+        await asyncio.gather(*(write() for _ in range(options['writers'])))
+        write_time = time.perf_counter() - started
+
+        # 📥 最後の書き込みの配信を待つ（一定時間届かなければ終了）
+        deadline = time.perf_counter() + options['drain']
+        last = -1
+        while time.perf_counter() < deadline and received != last:
+            last = received
+            await asyncio.sleep(1)
+        elapsed = (last_received_at[0] or time.perf_counter()) - started
+
+        from tasks.outbound import queue_stats
+        queues = queue_stats()
+
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        for communicator in clients:
+            await communicator.disconnect()
+
+        return {
+            'clients': len(clients),
+            'writes': options['writes'],
+            'write_time': write_time,
+            'elapsed': elapsed,
+            'received': received,
+            'latencies': latencies,
+            'per_connection': per_connection,
+            'queues': queues,
+        }
+
+    def report(self, stats, options):
+        latencies = [l * 1000 for l in stats['latencies']]
+        self.stdout.write(self.style.MIGRATE_HEADING('\nWebSocket fan-out'))
+        self.stdout.write(f'  clients           {stats["clients"]}')
+        self.stdout.write(f'  writes            {stats["writes"]} in {stats["write_time"]:.2f}s '
+                          f'({stats["writes"] / stats["write_time"]:.0f} writes/s, {options["writers"]} writers)')
+        self.stdout.write(f'  messages          {stats["received"]} delivered '
+                          f'({stats["received"] / stats["elapsed"]:.0f} msg/s)')
+        self.stdout.write(f'  delivery latency  p50 {percentile(latencies, 50):.1f} ms / '
+                          f'p99 {percentile(latencies, 99):.1f} ms / max {max(latencies, default=float("nan")):.1f} ms '
+                          f'({len(latencies)} samples)')
+        if latencies:
+            self.stdout.write(f'                    mean {statistics.mean(latencies):.1f} ms')
+        self.stdout.write(f'  memory            {stats["per_connection"] / 1024:.1f} KiB per connection (Python heap)')
+        self.stdout.write(f'  outbound queues   {stats["queues"]}')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from tasks.broadcast import defer, deferred_broadcasts
+from tasks.models import Task
+from tasks.ordering import rebalance_column
+from tasks.snapshots import bump_board_revision
+
+
+class Command(BaseCommand):
+    help = 'Re-spread Task.order ranks so every column has full gaps again'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status',
+            choices=[s[0] for s in Task.STATUS_CHOICES],
+            help='Rebalance only this column (default: all columns)',
+        )
+
+    def handle(self, *args, **options):
+        statuses = [options['status']] if options['status'] else [s[0] for s in Task.STATUS_CHOICES]
+
+        board_ids = Task.objects.order_by('board_id').values_list('board_id', flat=True).distinct()
+
+        # 接続中のクライアントはランクが全体的に変わるので、変わったボードの全件を配信する
+        with deferred_broadcasts():
+            for board_id in board_ids:
+                changed_total = 0
+                for status in statuses:
+                    # カラムのロックは rebalance_column が取る
+                    changed = rebalance_column(status, board_id=board_id)
+                    changed_total += len(changed)
+                    board = board_id if board_id is not None else 'shared'
+                    self.stdout.write(self.style.SUCCESS(f'✓ board {board} / {status}: {len(changed)} tasks updated'))
+                if changed_total:
+                    bump_board_revision(board_id)
+                    defer('snapshot', board_id)
@@ -0,0 +1,195 @@
+"""
+Prometheus のテキスト形式で公開する軽量なメトリクス。
+
+METRICS_ENABLED が False（デフォルト）の間は、計測の呼び出しはフラグを 1 回
+見るだけで何もしない。値はプロセスごとに持つので、複数プロセスで動かす場合は
+プロセスごとにスクレイプする。
+
+    from tasks import metrics
+    metrics.WS_CONNECTIONS.inc()
+    with metrics.GROUP_SEND_SECONDS.time():
+        ...
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+
+# 秒単位のヒストグラムのバケット
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def enabled():
+    return getattr(settings, "METRICS_ENABLED", False)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"'.replace("\n", " ") for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not enabled():
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        if not enabled():
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        if not enabled():
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not enabled():
+            return
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += 1
+            entry[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """ブロックの実行時間を記録する（無効なら時刻も取らない）"""
+        if not enabled():
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, key, value):
+        counts, total, sum_ = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            labels = _format_labels(self.label_names, key, [("le", bound)])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key, [("le", "+Inf")])
+        lines.append(f"{self.name}_bucket{labels} {total}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_count{labels} {total}")
+        lines.append(f"{self.name}_sum{labels} {sum_}")
+        return lines
+
+
+API_REQUEST_SECONDS = Histogram(
+    "tasks_api_request_seconds", "TaskViewSet request latency", labels=("action", "method", "status"),
+)
+WS_CONNECTIONS = Gauge("tasks_ws_connections", "Open WebSocket connections")
+WS_AUTH_FAILURES = Counter("tasks_ws_auth_failures_total", "WebSocket authentication failures", labels=("reason",))
+GROUP_SEND_SECONDS = Histogram("tasks_group_send_seconds", "channel_layer.group_send latency")
+SLACK_WEBHOOK_SECONDS = Histogram("tasks_slack_webhook_seconds", "Slack webhook request latency")
+SLACK_WEBHOOK_FAILURES = Counter("tasks_slack_webhook_failures_total", "Failed Slack deliveries", labels=("reason",))
+
+
+def _snapshot_lines():
+    """スクレイプ時に読む値（送信キューとトークンキャッシュの統計）"""
+    from .middleware import get_token_user_cache
+    from .outbound import queue_stats
+
+    lines = []
+    for key, value in queue_stats().items():
+        name = f"tasks_ws_outbound_{key}"
+        lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    for key, value in get_token_user_cache().stats().items():
+        name = f"tasks_ws_token_cache_{key}"
+        lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    return lines
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_snapshot_lines())
+    return "\n".join(lines) + "\n"
+
+
+def clear():
+    """テスト用: 記録した値をすべて消す"""
+    for metric in _registry:
+        metric.clear()
+
+
+def metrics_view(request):
+    """GET /metrics（METRICS_TOKEN を設定した場合は Bearer トークンが必要）"""
+    if not enabled():
+        return HttpResponseNotFound()
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
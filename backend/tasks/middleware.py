@@ -1,23 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
 from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
+from django.conf import settings
+
+
+class TokenUserCache:
+    """
+    JWT の jti をキーにしたユーザーのキャッシュ（TTL 付き LRU）。
+
+    エントリはトークンの exp か TTL のどちらか早い時刻に失効する。
+    再接続が集中したときに、同じトークンでのデコード後のユーザー取得
+    （スレッドプールへの切り替えと DB アクセス）を省略するために使う。
+
+    キャッシュはプロセス内にしかない。ユーザーの無効化・削除（signals.py）で
+    破棄されるのは同じプロセスのエントリだけで、QuerySet.update() による
+    無効化ではシグナル自体が発生しない。その場合も TTL が過ぎれば DB の
+    is_active で再確認されるので、TTL は数十秒程度にとどめる。
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, jti):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[jti]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(jti)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, jti, user, exp):
+        expires_at = min(exp, time.time() + self.ttl)
+        with self._lock:
+            self._entries[jti] = (user, expires_at)
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """ユーザーに紐づくエントリをすべて削除する（無効化・削除時）"""
+        with self._lock:
+            stale = [jti for jti, (user, _) in self._entries.items() if user.pk == user_id]
+            for jti in stale:
+                del self._entries[jti]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_token_user_cache = None
+
+
+def get_token_user_cache():
+    """プロセスで共有する TokenUserCache"""
+    global _token_user_cache
+    if _token_user_cache is None:
+        _token_user_cache = TokenUserCache(
+            maxsize=getattr(settings, "WS_TOKEN_CACHE_SIZE", 1024),
+            ttl=getattr(settings, "WS_TOKEN_CACHE_TTL", 60),
+        )
+    return _token_user_cache
 
 
 @database_sync_to_async
-def get_user_from_token(token_string):
+def _load_user(user_id):
     from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    return User.objects.filter(id=user_id, is_active=True).first()
+
+
+async def get_user_from_token(token_string):
     from django.contrib.auth.models import AnonymousUser
     from rest_framework_simplejwt.tokens import AccessToken
-    
-    User = get_user_model()
-    
+
+    # 署名と有効期限の検証は CPU のみなのでイベントループ上で行う
     try:
         access_token = AccessToken(token_string)
         user_id = access_token['user_id']
-        user = User.objects.get(id=user_id)
-        return user
     except Exception:
         return AnonymousUser()
 
+    cache = get_token_user_cache()
+    jti = access_token.get('jti')
+    if jti:
+        user = cache.get(jti)
+        if user is not None:
+            return user
+
+    user = await _load_user(user_id)
+    if user is None:
+        return AnonymousUser()
+
+    if jti:
+        cache.set(jti, user, access_token['exp'])
+    return user
+
 
 class JWTAuthMiddleware:
     """
@@ -29,7 +133,7 @@ class JWTAuthMiddleware:
 
     async def __call__(self, scope, receive, send):
         from django.contrib.auth.models import AnonymousUser
-        
+
         # 初期接続は匿名ユーザーとして許可（認証は接続後のメッセージで実施）
         scope['user'] = AnonymousUser()
 
@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+# tasks.ordering.ORDER_GAP と同じ値（マイグレーションはアプリのコードに依存させない）
+ORDER_GAP = 1024
+
+
+def spread_orders(apps, schema_editor):
+    """連番の order を ORDER_GAP 間隔のランクに変換する"""
+    Task = apps.get_model("tasks", "Task")
+    statuses = Task.objects.values_list("status", flat=True).distinct()
+    for status in statuses:
+        tasks = list(Task.objects.filter(status=status).order_by("order", "id"))
+        for i, task in enumerate(tasks, start=1):
+            task.order = i * ORDER_GAP
+        Task.objects.bulk_update(tasks, ["order"], batch_size=1000)
+
+
+def compact_orders(apps, schema_editor):
+    """ランクを連番に戻す"""
+    Task = apps.get_model("tasks", "Task")
+    statuses = Task.objects.values_list("status", flat=True).distinct()
+    for status in statuses:
+        tasks = list(Task.objects.filter(status=status).order_by("order", "id"))
+        for i, task in enumerate(tasks):
+            task.order = i
+        Task.objects.bulk_update(tasks, ["order"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='order',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(spread_orders, compact_orders),
+    ]
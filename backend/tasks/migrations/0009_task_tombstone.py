@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_board_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('board', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='tasks.board')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx')],
+            },
+        ),
+    ]
@@ -2,6 +2,32 @@ from django.db import models
 from django.contrib.auth.models import User
 
 
+class Board(models.Model):
+    """
+    タスクをまとめるボード。メンバーだけが購読・閲覧できる。
+
+    名前・メンバーの変更とボードの削除ができるのは作成者（owner）と管理者だけ。
+    """
+
+    name = models.CharField(max_length=100)
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name="owned_boards",
+        null=True,
+        blank=True,
+    )
+    members = models.ManyToManyField(
+        User,
+        related_name="boards",
+        blank=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Task(models.Model):
     STATUS_CHOICES = [
         ("todo", "To Do"),
@@ -15,6 +41,15 @@ class Task(models.Model):
         related_name="tasks"
     )
 
+    # None は全員が参加する共有ボード（従来の tasks_all）
+    board = models.ForeignKey(
+        Board,
+        on_delete=models.CASCADE,
+        related_name="tasks",
+        null=True,
+        blank=True,
+    )
+
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     status = models.CharField(
@@ -22,11 +57,51 @@ class Task(models.Model):
         choices=STATUS_CHOICES,
         default="todo",
     )
-    order = models.IntegerField(default=0)
+    # カラム内の並び順。tasks.ordering.ORDER_GAP 間隔の疎なランク
+    order = models.BigIntegerField(default=0)
+    # 保存のたびに 1 つ進む版（楽観的排他制御、tasks/concurrency.py）
+    version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # 一覧・並び替え・全件同期はすべて (status, order) 順で読む
+            models.Index(fields=["status", "order", "id"], name="task_status_order_idx"),
+            # ボード単位のカラム（並び替え・末尾への追加）
+            models.Index(fields=["board", "status", "order", "id"], name="task_board_column_idx"),
+            # 差分同期（updated_at 以降の変更）用
+            models.Index(fields=["updated_at"], name="task_updated_at_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
 
+
+
+class TaskTombstone(models.Model):
+    """
+    削除されたタスクの記録（差分同期 GET /api/tasks/changes/ 用）。
+
+    タスク本体は消えているので id とボードだけを残す。
+    古いものは prune_task_tombstones コマンドで削除する。
+    """
+
+    task_id = models.BigIntegerField()
+    board = models.ForeignKey(
+        Board,
+        on_delete=models.CASCADE,
+        related_name="tombstones",
+        null=True,
+        blank=True,
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"deleted task {self.task_id}"
@@ -0,0 +1,186 @@
+"""
+カラム内の並び順（Task.order）を管理するヘルパー。
+
+order は連番ではなく ORDER_GAP 間隔の疎な整数ランクで保持する。
+カードを移動するときは前後のカードのランクの中間値を割り当てるだけなので、
+通常は移動したタスク 1 行だけを UPDATE すれば済む。
+中間値が取れなくなった（隙間を使い切った）場合は、移動先より後ろのタスクを
+UPDATE ... SET order = order + ORDER_GAP の 1 文でずらして隙間を作る。
+どちらもカラムの件数に関係なく決まった数の SQL で済む。
+
+カラムはボードごとに独立している（board_id が None のタスクは共有ボード）。
+
+移動したタスクは版（Task.version）を確認して保存するので、行ロックは取らない。
+ずらしたことで他のタスクのランクだけが変わる場合、それらの版は進めない。
+"""
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .concurrency import asave_task, save_task
+from .models import Task
+
+# 隣接するタスク同士のランクの間隔
+ORDER_GAP = 1024
+
+
+def column_queryset(status, board_id=None):
+    """指定ボード・ステータスのカラムを表示順で返す"""
+    return Task.objects.filter(board_id=board_id, status=status).order_by("order", "id")
+
+
+def next_order(status, board_id=None):
+    """カラム末尾に追加するタスクのランク"""
+    last = column_queryset(status, board_id).aggregate(last=Max("order"))["last"]
+    if last is None:
+        return ORDER_GAP
+    return last + ORDER_GAP
+
+
+async def anext_order(status, board_id=None):
+    """next_order の非同期版"""
+    last = (await column_queryset(status, board_id).aaggregate(last=Max("order")))["last"]
+    if last is None:
+        return ORDER_GAP
+    return last + ORDER_GAP
+
+
+def _neighbours(task, status, index):
+    """移動先 index の直前・直後のタスクの (order, id) を返す (before, after)"""
+    others = column_queryset(status, task.board_id).exclude(pk=task.pk).values_list("order", "id")
+
+    if index == 0:
+        after = others.first()
+        return None, after
+
+    window = list(others[index - 1:index + 1])
+    if not window:
+        # index がカラムの件数を超えている場合は末尾に置く
+        return others.last(), None
+    if len(window) == 1:
+        return window[0], None
+    return window[0], window[1]
+
+
+async def _aneighbours(task, status, index):
+    """_neighbours の非同期版"""
+    others = column_queryset(status, task.board_id).exclude(pk=task.pk).values_list("order", "id")
+
+    if index == 0:
+        return None, await others.afirst()
+
+    window = [row async for row in others[index - 1:index + 1]]
+    if not window:
+        return await others.alast(), None
+    if len(window) == 1:
+        return window[0], None
+    return window[0], window[1]
+
+
+def _rank_between(before, after):
+    """before と after（(order, id)）の間に入るランク。隙間が無ければ None"""
+    if before is None and after is None:
+        return ORDER_GAP
+    if before is None:
+        return after[0] - ORDER_GAP
+    if after is None:
+        return before[0] + ORDER_GAP
+    if after[0] - before[0] > 1:
+        return (before[0] + after[0]) // 2
+    return None
+
+
+def move_row(task):
+    return {"id": task.id, "status": task.status, "order": task.order, "version": task.version}
+
+
+def _behind(task, status, before):
+    """カラムの中で before より後ろにあるタスク（task 自身は除く）"""
+    order, pk = before
+    return column_queryset(status, task.board_id).exclude(pk=task.pk).filter(
+        Q(order__gt=order) | Q(order=order, id__gt=pk)
+    )
+
+
+def shift_and_place(task, status, before):
+    """
+    before より後ろのタスクを 1 文で ORDER_GAP ずらし、空いた隙間に task を置く。
+
+    ずらす UPDATE は order = order + ORDER_GAP の式なので、同じカラムで同時に
+    ずらしても読み込んだ値で上書きすることはない（行ロックは UPDATE が取る）。
+    task の版が違えば全体をロールバックして VersionConflict を送出する。
+    変更された行（task が先頭、続いてずらした行）を返す。
+    """
+    behind = _behind(task, status, before)
+    with transaction.atomic():
+        # 差分同期（updated_at 以降の変更）にも返るよう updated_at を進める。版は進めない
+        behind.update(order=F("order") + ORDER_GAP, updated_at=timezone.now())
+        task.status = status
+        task.order = before[0] + ORDER_GAP // 2
+        save_task(task, ["status", "order"])
+        # ずらした範囲（差分配信用）。ずらした後も before より後ろにある
+        shifted = list(behind.values("id", "status", "order", "version"))
+    return [move_row(task)] + shifted
+
+
+def rebalance_column(status, board_id=None):
+    """
+    カラム全体のランクを ORDER_GAP 間隔で振り直す（rebalance_task_order コマンド用）。
+
+    ずらし続けてランクが大きくなったカラムを整える。並び替えとは独立した保守作業なので、
+    カラムの行をロックしてから読み直し、order と updated_at（差分同期用）だけを bulk_update する。
+    変更された行を [{"id", "status", "order", "version"}, ...] で返す。
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(column_queryset(status, board_id).select_for_update())
+        changed = []
+        for i, t in enumerate(tasks, start=1):
+            if t.order != i * ORDER_GAP:
+                t.order = i * ORDER_GAP
+                t.updated_at = now
+                changed.append(t)
+        Task.objects.bulk_update(changed, ["order", "updated_at"], batch_size=1000)
+    return [move_row(t) for t in changed]
+
+
+def place_task(task, status, index):
+    """
+    task を status カラムの index 番目に移動する。
+
+    前後のランクの中間値を割り当て、移動したタスクのみを保存する。
+    隙間を使い切っている場合は後ろのタスクをずらす（shift_and_place）。
+    task が読み込んだ後に更新されていれば VersionConflict を送出する。
+    変更された行を [{"id", "status", "order", "version"}, ...] で返す。
+    """
+    index = max(0, index)
+    before, after = _neighbours(task, status, index)
+    rank = _rank_between(before, after)
+
+    if rank is None:
+        return shift_and_place(task, status, before)
+
+    task.status = status
+    task.order = rank
+    save_task(task, ["status", "order"])
+    return [move_row(task)]
+
+
+async def aplace_task(task, status, index):
+    """
+    place_task の非同期版。
+
+    後ろのタスクをずらす場合（まれ）はトランザクションが必要なのでスレッドで実行する。
+    """
+    index = max(0, index)
+    before, after = await _aneighbours(task, status, index)
+    rank = _rank_between(before, after)
+
+    if rank is None:
+        return await sync_to_async(shift_and_place)(status=status, task=task, before=before)
+
+    task.status = status
+    task.order = rank
+    await asave_task(task, ["status", "order"])
+    return [move_row(task)]
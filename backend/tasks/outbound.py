@@ -0,0 +1,137 @@
+"""
+WebSocket 接続ごとの送信キュー。
+
+チャンネルレイヤーからのイベントはすぐにこのキューへ積み、別タスクで
+クライアントへ送信する。送信が遅いクライアントがいても consumer は
+チャンネルレイヤーからの受信を止めないので、レイヤー側のバッファが
+溢れて黙ってメッセージが捨てられることがない。
+
+同じタスクへの未送信の更新は最新のものだけを残す（上書き）。
+それでも上限を超えた場合は未送信分を捨て、全件の取り直しを要求する。
+"""
+import asyncio
+import itertools
+import json
+import logging
+import weakref
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 生きているキュー（統計用）
+_live_queues = weakref.WeakSet()
+
+
+def coalesce_key(event, group=None):
+    """
+    上書きしてよいイベントのキー。None の場合は上書きしない。
+
+    task_update / task_delete は同じタスクの最新状態だけが意味を持つ。
+    1 行だけの task_move も同様。全件同期は同じボード（group）の新しいもので
+    置き換えられる。
+    """
+    event_type = event.get("type")
+    if event_type == "task_update":
+        return ("task", event["task"]["id"])
+    if event_type == "task_delete":
+        return ("task", event["task_id"])
+    if event_type == "task_move" and len(event["tasks"]) == 1:
+        return ("move", event["tasks"][0]["id"])
+    if event_type == "task_bulk_update":
+        return ("snapshot", group)
+    return None
+
+
+class OutboundQueue:
+    """上限付き・同一タスクの更新を上書きする送信キュー"""
+
+    def __init__(self, send, maxsize=256):
+        self._send = send
+        self.maxsize = maxsize
+        self._pending = OrderedDict()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+        self.max_depth = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.resnapshots = 0
+        _live_queues.add(self)
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        _live_queues.discard(self)
+
+    def put(self, text, key=None):
+        """送信するテキスト（またはバイナリのフレーム）を積む（ブロックしない）"""
+        if key is not None and key in self._pending:
+            # 未送信の古い更新を捨て、最新のものを末尾に積む
+            # （間に積まれた他のイベントより後に届くので最新状態が保たれる）
+            del self._pending[key]
+            self._pending[key] = text
+            self.coalesced += 1
+            return
+
+        if len(self._pending) >= self.maxsize:
+            self._overflow()
+
+        self._pending[key if key is not None else ("seq", next(self._seq))] = text
+        self.max_depth = max(self.max_depth, len(self._pending))
+        self._wakeup.set()
+
+    def _overflow(self):
+        """クライアントが追いつけないので未送信分を捨てて全件の取り直しを要求する"""
+        self.dropped += len(self._pending)
+        self.resnapshots += 1
+        self._pending.clear()
+        self._pending[("seq", next(self._seq))] = json.dumps({"type": "resnapshot"})
+        logger.warning("WebSocket client fell behind - requesting resnapshot")
+
+    async def _run(self):
+        while True:
+            while not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            _, text = self._pending.popitem(last=False)
+            await self._send(text)
+            self.sent += 1
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "resnapshots": self.resnapshots,
+        }
+
+
+def queue_stats():
+    """全接続の送信キューの集計"""
+    queues = list(_live_queues)
+    depths = [q.depth for q in queues]
+    return {
+        "connections": len(queues),
+        "depth_total": sum(depths),
+        "depth_max": max(depths, default=0),
+        "coalesced": sum(q.coalesced for q in queues),
+        "dropped": sum(q.dropped for q in queues),
+        "resnapshots": sum(q.resnapshots for q in queues),
+    }
@@ -0,0 +1,80 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    (status, order, id) をキーにしたカーソル（keyset）ページネーション。
+
+    ?limit= か ?cursor= が指定された場合のみページ分割する。
+    どちらも無い場合は従来どおり全件を返す（既存クライアントとの互換性のため）。
+    queryset は status, order, id の昇順に並んでいる必要がある。
+    """
+
+    default_limit = 100
+    max_limit = 500
+    limit_query_param = "limit"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.limit_query_param not in params and self.cursor_query_param not in params:
+            return None
+
+        self.request = request
+        self.limit = self.get_limit(request)
+
+        encoded = params.get(self.cursor_query_param)
+        if encoded:
+            status, order, pk = self.decode_cursor(encoded)
+            queryset = queryset.filter(
+                Q(status__gt=status)
+                | Q(status=status, order__gt=order)
+                | Q(status=status, order=order, id__gt=pk)
+            )
+
+        rows = list(queryset[:self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, self.default_limit))
+        except (TypeError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def encode_cursor(self, task):
+        raw = json.dumps([task.status, task.order, task.id]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            status, order, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return str(status), int(order), int(pk)
+        except (binascii.Error, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "cursor": self.next_cursor,
+            "results": data,
+        })
@@ -1,8 +1,36 @@
+import hashlib
+
 from rest_framework import serializers
-from .models import Task
+from .concurrency import save_task
+from .models import Board, Task
+
+
+class SparseFieldsMixin:
+    """
+    ?fields=id,title,status のように返すフィールドを絞り込めるようにする。
+
+    id は差分の適用に必要なので常に含める。
+    """
+
+    always_included_fields = ("id",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get("request")
+        if request is None or request.method != "GET":
+            return
+        requested = request.query_params.get("fields")
+        if not requested:
+            return
+
+        allowed = {f.strip() for f in requested.split(",") if f.strip()}
+        allowed.update(self.always_included_fields)
+        for name in set(self.fields) - allowed:
+            self.fields.pop(name)
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # ✅ 作成者のユーザー名を追加
     username = serializers.CharField(
         source="user.username",
@@ -15,8 +43,75 @@ class TaskSerializer(serializers.ModelSerializer):
             "id",
             "title",
             "description",
+            "board",
             "status",
+            "order",
+            "version",
             "username",
             "created_at",
             "updated_at",
         ]
+        # 並び順はサーバー側で管理する（reorder エンドポイントで変更）
+        read_only_fields = ["order", "version"]
+
+    def update(self, instance, validated_data):
+        # 版を確認して 1 文で保存する（競合すれば VersionConflict）
+        expected_version = validated_data.pop("expected_version", None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        save_task(instance, list(validated_data), expected_version)
+        return instance
+
+    def validate_board(self, board):
+        # メンバーでないボードにはタスクを作れない
+        request = self.context.get("request")
+        if board is not None and request is not None and not request.user.is_staff:
+            if not board.members.filter(pk=request.user.pk).exists():
+                raise serializers.ValidationError("このボードのメンバーではありません。")
+        return board
+
+
+class TaskCardSerializer(TaskSerializer):
+    """
+    一覧・差分同期・WebSocket の配信で使うカード表示用の形式。
+
+    本文（description）は長さとハッシュだけを返す。本文はカードを開いたときに
+    GET /api/tasks/{id}/ で取得し、ハッシュが変わったときだけ取り直せばよい。
+    """
+
+    description_length = serializers.SerializerMethodField()
+    description_hash = serializers.SerializerMethodField()
+
+    class Meta(TaskSerializer.Meta):
+        fields = [
+            "id",
+            "title",
+            "board",
+            "status",
+            "order",
+            "version",
+            "username",
+            "updated_at",
+            "description_length",
+            "description_hash",
+        ]
+
+    def get_description_length(self, task):
+        return len(task.description)
+
+    def get_description_hash(self, task):
+        return hashlib.sha1(task.description.encode()).hexdigest()[:16]
+
+
+class BoardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Board
+        fields = [
+            "id",
+            "name",
+            "owner",
+            "members",
+            "created_at",
+        ]
+        read_only_fields = ["owner"]
+        extra_kwargs = {"members": {"required": False}}
@@ -0,0 +1,54 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .events import board_group
+from .middleware import get_token_user_cache
+from .models import Board
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_token_cache_on_deactivate(sender, instance, **kwargs):
+    """
+    無効化されたユーザーのキャッシュ済みトークンを破棄する。
+
+    このプロセスのキャッシュだけが対象（他のプロセスは TTL で失効する）。
+    """
+    if not instance.is_active:
+        get_token_user_cache().invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def invalidate_token_cache_on_delete(sender, instance, **kwargs):
+    get_token_user_cache().invalidate_user(instance.pk)
+
+
+def notify_board_members_changed(board_id):
+    """ボードを購読中の接続にメンバーの再確認を促す（コミット後）"""
+    def send():
+        async_to_sync(get_channel_layer().group_send)(board_group(board_id), {
+            "type": "board_members_changed",
+            "board": board_id,
+        })
+    transaction.on_commit(send)
+
+
+@receiver(m2m_changed, sender=Board.members.through)
+def board_members_removed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "post_remove":
+        # reverse は user.boards.remove(...) の場合（instance がユーザー）
+        board_ids = pk_set if reverse else [instance.pk]
+    elif action == "pre_clear":
+        board_ids = list(instance.boards.values_list("id", flat=True)) if reverse else [instance.pk]
+    else:
+        return
+    for board_id in board_ids:
+        notify_board_members_changed(board_id)
+
+
+@receiver(post_delete, sender=Board)
+def board_deleted(sender, instance, **kwargs):
+    notify_board_members_changed(instance.pk)
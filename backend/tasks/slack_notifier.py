@@ -1,42 +1,203 @@
 import os
+import queue
+import threading
+import time
 import logging
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SlackDispatcher:
+    """
+    Slack 通知をバックグラウンドのスレッドで送信するディスパッチャー。
+
+    API のリクエスト処理はキューに積むだけで戻り、ワーカースレッドが
+    batch_window 秒の間に積まれた通知を 1 つのメッセージにまとめて送信する。
+    送信に失敗した場合は指数バックオフで再試行する。
+    HTTP 接続はセッションで使い回す。
+    """
+
+    def __init__(
+        self,
+        batch_window=1.0,
+        max_batch=20,
+        max_retries=3,
+        backoff=0.5,
+        timeout=5,
+        maxsize=1000,
+    ):
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, webhook_url, attachment):
+        """通知をキューに積む（ブロックしない）"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((webhook_url, attachment))
+        except queue.Full:
+            logger.warning("Slack notification queue is full - dropping notification")
+
+    def flush(self, timeout=None):
+        """キューに積まれた通知をすべて送信し終えるまで待つ（テスト・終了処理用）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name="slack-dispatcher",
+                    daemon=True,
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+
+            # バッチ期間内に届いた通知をまとめる
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                by_url = {}
+                for webhook_url, attachment in batch:
+                    by_url.setdefault(webhook_url, []).append(attachment)
+                for webhook_url, attachments in by_url.items():
+                    self._deliver(webhook_url, attachments)
+            except Exception:
+                logger.exception("Slack dispatcher failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _deliver(self, webhook_url, attachments):
+        payload = {"attachments": attachments}
+        if len(attachments) > 1:
+            payload["text"] = f"{len(attachments)} 件のタスク通知"
+
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                with metrics.SLACK_WEBHOOK_SECONDS.time():
+                    response = self._session.post(webhook_url, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                response = None
+            else:
+                if response.ok:
+                    return True
+                if not _is_retryable(response.status_code):
+                    # 404（webhook の削除）などは再試行しても成功しない
+                    logger.error("Slack notification rejected: HTTP %s", response.status_code)
+                    metrics.SLACK_WEBHOOK_FAILURES.inc(reason="rejected")
+                    return False
+
+            if attempt == self.max_retries:
+                # ログに記録してサイレント失敗（API エラーは返さない）
+                logger.error("Slack notification failed after %s attempts", attempt + 1)
+                metrics.SLACK_WEBHOOK_FAILURES.inc(reason="retries_exhausted")
+                return False
+
+            wait = delay
+            if response is not None and response.status_code == 429:
+                # レート制限時は Slack が指定する時間だけ待つ
+                wait = _retry_after(response, delay)
+            time.sleep(wait)
+            delay *= 2
+        return False
+
+
+def _is_retryable(status_code):
+    """レート制限とサーバー側のエラーだけ再試行する"""
+    return status_code == 429 or status_code >= 500
+
+
+def _retry_after(response, default):
+    """Retry-After ヘッダーの秒数（HTTP-date 形式にも対応、読めなければ default）"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """プロセスで共有する SlackDispatcher"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = SlackDispatcher(
+                    batch_window=getattr(settings, "SLACK_BATCH_WINDOW", 1.0),
+                )
+    return _dispatcher
+
 
 def send_slack_notification(message: str, title: str = None, color: str = "#36a64f"):
     """
     Slack webhook を通じてメッセージを送信します。
-    
+
+    送信はバックグラウンドで行われ、この関数はすぐに戻ります。
+
     Args:
         message: 通知の本文テキスト
         title: 通知のタイトル（オプション）
         color: メッセージの色コード（デフォルト: 緑 #36a64f）
     """
     webhook_url = os.getenv("SLACK_WEBHOOK_URL")
-    
+
     # webhook URL が設定されていない場合はスキップ
     if not webhook_url:
         return
-    
-    payload = {
-        "attachments": [
-            {
-                "color": color,
-                "title": title or "Task Notification",
-                "text": message,
-                "footer": "Task Board",
-            }
-        ]
+
+    attachment = {
+        "color": color,
+        "title": title or "Task Notification",
+        "text": message,
+        "footer": "Task Board",
     }
-    
-    logger = logging.getLogger(__name__)
-    try:
-        response = requests.post(webhook_url, json=payload, timeout=5)
-        response.raise_for_status()
-    except requests.RequestException:
-        # ログに記録してサイレント失敗（API エラーは返さない）
-        logger.exception("Slack notification failed")
+    get_dispatcher().enqueue(webhook_url, attachment)
 
 
 def notify_task_created(task):
@@ -55,3 +216,13 @@ def notify_task_title_updated(old_title: str, new_title: str, username: str):
     """タスクタイトル編集時の通知"""
     message = f"タスク「{old_title}」が「{new_title}」に変更されました。\n編集者: @{username}"
     send_slack_notification(message, title="✏️ タスク名が変更されました", color="#f9a825")
+
+
+def notify_bulk_operations(counts: dict, username: str):
+    """一括操作の結果をまとめて 1 件で通知"""
+    labels = {"created": "作成", "updated": "更新", "moved": "移動", "deleted": "削除"}
+    summary = " / ".join(f"{labels[k]} {v}件" for k, v in counts.items() if v)
+    if not summary:
+        return
+    message = f"タスクの一括操作が実行されました。\n{summary}\n実行者: @{username}"
+    send_slack_notification(message, title="📦 一括操作", color="#6a1b9a")
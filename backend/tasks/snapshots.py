@@ -0,0 +1,164 @@
+"""
+ボードのスナップショット（一覧 API の応答）のキャッシュ。
+
+ボードごとにリビジョン番号を持ち、タスクの作成・更新・削除・並び替えのたびに
+書き込み側（tasks/views.py）が bump_board_revision() で進める。
+シリアライズ済みのスナップショットは (ボード, リビジョン) をキーに保存するので、
+リビジョンが進めば古いスナップショットは自然に使われなくなる。
+
+キャッシュは 2 段で、プロセス内の LRU の後ろに Django のキャッシュ
+（TASK_SNAPSHOT_CACHE、複数プロセスでは Redis）を置く。
+リビジョン番号は複数プロセスで共有する必要があるので Django のキャッシュにだけ置く。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# 書き込み経路を通らない変更（管理画面など）があっても、この秒数で取り直す
+SNAPSHOT_TTL = 300
+
+
+def _cache():
+    return caches[getattr(settings, "TASK_SNAPSHOT_CACHE", "default")]
+
+
+def _board_key(board_id):
+    return f"tasks:board:{'shared' if board_id is None else board_id}"
+
+
+class LocalSnapshotCache:
+    """プロセス内の LRU（スナップショットとエンコード済みの応答）"""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + SNAPSHOT_TTL)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalSnapshotCache()
+
+
+def bump_board_revision(board_id):
+    """ボードのリビジョンを進める（キャッシュ済みのスナップショットを無効にする）"""
+    key = f"{_board_key(board_id)}:revision"
+    try:
+        _cache().incr(key)
+    except ValueError:
+        # まだ無い（または追い出された）場合は以前の値と重ならない値から始める
+        _cache().set(key, time.time_ns(), None)
+
+
+async def abump_board_revision(board_id):
+    """bump_board_revision の非同期版"""
+    key = f"{_board_key(board_id)}:revision"
+    try:
+        await _cache().aincr(key)
+    except ValueError:
+        await _cache().aset(key, time.time_ns(), None)
+
+
+def board_revisions(board_ids):
+    """{board_id: revision}。まだリビジョンの無いボードには新しく割り当てる"""
+    cache = _cache()
+    keys = {f"{_board_key(board_id)}:revision": board_id for board_id in board_ids}
+    found = cache.get_many(list(keys))
+    revisions = {}
+    for key, board_id in keys.items():
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        revisions[board_id] = found[key]
+    return revisions
+
+
+async def aboard_revisions(board_ids):
+    """board_revisions の非同期版"""
+    cache = _cache()
+    keys = {f"{_board_key(board_id)}:revision": board_id for board_id in board_ids}
+    found = await cache.aget_many(list(keys))
+    revisions = {}
+    for key, board_id in keys.items():
+        if key not in found:
+            await cache.aadd(key, time.time_ns(), None)
+            found[key] = await cache.aget(key)
+        revisions[board_id] = found[key]
+    return revisions
+
+
+def board_snapshot(board_id, revision, load):
+    """
+    ボードのシリアライズ済みタスク一覧。
+
+    キャッシュに無ければ load() で読み込んで保存する。
+    """
+    key = f"{_board_key(board_id)}:snapshot:{revision}"
+    rows = local_cache.get(key)
+    if rows is not None:
+        return rows
+
+    rows = _cache().get(key)
+    if rows is None:
+        rows = load()
+        _cache().set(key, rows, SNAPSHOT_TTL)
+    local_cache.set(key, rows)
+    return rows
+
+
+async def aboard_snapshot(board_id, revision, load):
+    """board_snapshot の非同期版（load はコルーチン関数）"""
+    key = f"{_board_key(board_id)}:snapshot:{revision}"
+    rows = local_cache.get(key)
+    if rows is not None:
+        return rows
+
+    rows = await _cache().aget(key)
+    if rows is None:
+        rows = await load()
+        await _cache().aset(key, rows, SNAPSHOT_TTL)
+    local_cache.set(key, rows)
+    return rows
+
+
+def snapshot_etag(revisions, *extra):
+    """ボードとリビジョンの組（と絞り込み条件）から作る強い ETag"""
+    parts = [f"{board_id}:{revision}" for board_id, revision in sorted(
+        revisions.items(), key=lambda item: (item[0] is not None, item[0] or 0)
+    )]
+    digest = hashlib.sha1("|".join(parts + [str(e) for e in extra]).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def clear():
+    """テスト用: プロセス内のキャッシュを空にする"""
+    local_cache.clear()
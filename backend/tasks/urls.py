@@ -1,8 +1,16 @@
 # tasks/urls.py
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import TaskViewSet
+from . import async_views
+from .views import BoardViewSet, TaskViewSet
 
 router = DefaultRouter()
 router.register("tasks", TaskViewSet, basename="task")
+router.register("boards", BoardViewSet, basename="board")
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    # 非同期ビュー版のタスク API（tasks/async_views.py）
+    path("async/tasks/", async_views.TaskListView.as_view()),
+    path("async/tasks/reorder/", async_views.TaskReorderView.as_view()),
+    path("async/tasks/<int:pk>/", async_views.TaskDetailView.as_view()),
+]
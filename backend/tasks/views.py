@@ -1,75 +1,404 @@
+import datetime
+import time
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.renderers import JSONRenderer
 
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metrics
+from .models import Board, Task, TaskTombstone
+from .serializers import BoardSerializer, TaskCardSerializer, TaskSerializer
+from .pagination import TaskCursorPagination
+from .concurrency import VersionConflict, delete_task, requested_version, task_etag
+from .ordering import next_order, place_task
+from .events import get_event_log
+from .snapshots import (
+    board_revisions,
+    board_snapshot,
+    bump_board_revision,
+    etag_matches,
+    local_cache,
+    snapshot_etag,
+)
+from .broadcast import defer, deferred_broadcasts
+from .bulk import BulkOperationError, apply_bulk_operations
+from .slack_notifier import (
+    notify_bulk_operations,
+    notify_task_created,
+    notify_task_done,
+    notify_task_title_updated,
+    send_slack_notification,
+)
+
+# 差分同期（changes）の 1 回あたりの件数
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 1000
+# 差分同期で cursor より前に遡って読む幅（コミットが遅れたトランザクション対策）
+CHANGES_OVERLAP = datetime.timedelta(seconds=2)
+# 並び替えが他の更新と競合したときに読み直す回数（版を指定されていない場合）
+REORDER_ATTEMPTS = 3
+
+
+def visible_board_ids(user):
+    """ユーザーが閲覧できるボードの id（None は共有ボード）"""
+    boards = Board.objects.all() if user.is_staff else user.boards.all()
+    return [None] + list(boards.order_by("id").values_list("id", flat=True))
+
+
+def load_board_rows(board_id):
+    """ボードの全タスクをカード形式でシリアライズする（スナップショット用）"""
+    tasks = Task.objects.filter(board_id=board_id).select_related("user").order_by("status", "order", "id")
+    return [dict(row) for row in TaskCardSerializer(tasks, many=True).data]
+
+
+def parse_changes_cursor(value):
+    """
+    changes の since を (日時, id) にする。
+
+    id はページの続きを表す "日時,id" の形式のときだけ付く（日時だけなら None）。
+    日時として読めなければ (None, None)。
+    """
+    stamp, _, after_id = (value or "").partition(",")
+    since = parse_datetime(stamp)
+    if since is None:
+        return None, None
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, datetime.timezone.utc)
+    if not after_id:
+        return since, None
+    try:
+        return since, int(after_id)
+    except ValueError:
+        return None, None
+
+
+def visible_tasks(user, model=Task):
+    """ユーザーが閲覧できるタスク（共有ボードと、メンバーになっているボード）"""
+    if user.is_staff:
+        return model.objects.all()
+    return model.objects.filter(Q(board__isnull=True) | Q(board__members=user))
+
+
+class PrerenderedResponse(Response):
+    """エンコード済みの本文をそのまま返す Response（data はテストやログ用に残す）"""
+
+    def __init__(self, data, body, **kwargs):
+        super().__init__(data, content_type="application/json", **kwargs)
+        self._body = body
+
+    @property
+    def rendered_content(self):
+        return self._body
+
+
+class BoardViewSet(viewsets.ModelViewSet):
+    serializer_class = BoardSerializer
+    permission_classes = [IsAuthenticated]
 
-from .models import Task
-from .serializers import TaskSerializer
-from .slack_notifier import notify_task_created, notify_task_done, notify_task_title_updated
+    def get_queryset(self):
+        boards = Board.objects.prefetch_related("members").order_by("id")
+        if self.request.user.is_staff:
+            return boards
+        return boards.filter(members=self.request.user)
+
+    def perform_create(self, serializer):
+        board = serializer.save(owner=self.request.user)
+        # 作成者は必ずメンバーにする
+        board.members.add(self.request.user)
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+    def check_can_manage(self, board):
+        user = self.request.user
+        if board.owner_id != user.id and not user.is_staff:
+            raise PermissionDenied("ボードを変更・削除できるのは作成者と管理者だけです。")
+
+    def perform_update(self, serializer):
+        self.check_can_manage(serializer.instance)
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        self.check_can_manage(instance)
+        # 他のユーザーのタスクを巻き込んで削除しないよう、空のボードだけ削除できる
+        if instance.tasks.exists():
+            raise ValidationError({"error": "タスクが残っているボードは削除できません。"})
+        instance.delete()
 
 
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TaskCursorPagination
+
+    def dispatch(self, request, *args, **kwargs):
+        if not metrics.enabled():
+            # 配信と Slack 通知はコミット後にリクエスト単位でまとめて送る
+            with deferred_broadcasts():
+                return super().dispatch(request, *args, **kwargs)
+
+        started = time.perf_counter()
+        with deferred_broadcasts():
+            response = super().dispatch(request, *args, **kwargs)
+        metrics.API_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            action=getattr(self, "action", None) or "unknown",
+            method=request.method,
+            status=response.status_code,
+        )
+        return response
+
+    def get_serializer_class(self):
+        # 一覧と差分同期はカード形式（本文は ?fields=description で明示したときだけ返す）
+        if self.action in ("list", "changes") and "description" not in self.requested_fields():
+            return TaskCardSerializer
+        return TaskSerializer
+
+    def requested_fields(self):
+        requested = self.request.query_params.get("fields") or ""
+        return {f.strip() for f in requested.split(",")}
+
+    def handle_exception(self, exc):
+        if isinstance(exc, VersionConflict):
+            return self.conflict_response(exc.task_id)
+        return super().handle_exception(exc)
+
+    def conflict_response(self, task_id):
+        """409 と現在のタスク（既に削除されていれば 404）"""
+        current = visible_tasks(self.request.user).select_related("user").filter(pk=task_id).first()
+        if current is None:
+            return Response({"error": "task not found"}, status=status.HTTP_404_NOT_FOUND)
+        response = Response(
+            {"error": "タスクは他のユーザーによって更新されています。", "task": TaskSerializer(current).data},
+            status=status.HTTP_409_CONFLICT,
+        )
+        response["ETag"] = task_etag(current)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        # 版を ETag として返す（更新時に If-Match で送り返す）
+        task = self.get_object()
+        response = Response(self.get_serializer(task).data)
+        response["ETag"] = task_etag(task)
+        return response
 
     def get_queryset(self):
-        return Task.objects.all().order_by("status", "order")
+        queryset = visible_tasks(self.request.user).select_related("user").order_by("status", "order", "id")
+
+        if self.action != "list":
+            return queryset
+
+        board, column = self.list_filters()
+        if board is not None:
+            queryset = queryset.filter(board_id=board)
+        if column:
+            queryset = queryset.filter(status=column)
+        return queryset
+
+    def list_filters(self):
+        """?board=1 でボード単位、?status=todo でカラム単位で取得できる"""
+        board = self.request.query_params.get("board")
+        if board:
+            try:
+                board = int(board)
+            except ValueError:
+                raise ValidationError({"error": "invalid board"})
+        else:
+            board = None
+
+        column = self.request.query_params.get("status")
+        if column:
+            valid_statuses = [s[0] for s in Task.STATUS_CHOICES]
+            if column not in valid_statuses:
+                raise ValidationError({"error": "invalid status"})
+        return board, column
+
+    def list(self, request, *args, **kwargs):
+        # 取得前のリビジョンを返す（これ以降のイベントは WebSocket の resume で受け取れる）
+        revision = get_event_log().current_revision()
+        if self.can_use_snapshot(request):
+            response = self.snapshot_list(request)
+        else:
+            response = super().list(request, *args, **kwargs)
+        response["X-Board-Revision"] = str(revision)
+        return response
+
+    def can_use_snapshot(self, request):
+        """全件取得（ページ分割・?fields なし）の JSON 応答だけキャッシュを使う"""
+        params = request.query_params
+        if any(p in params for p in ("fields", "limit", "cursor")):
+            return False
+        return request.accepted_renderer.format == "json"
+
+    def snapshot_list(self, request):
+        """
+        閲覧できるボードのスナップショットをつなげて返す。
+
+        ETag はボードのリビジョンから作るので、If-None-Match が一致すれば
+        タスクを読まずに 304 を返せる。
+        """
+        board, column = self.list_filters()
+        board_ids = visible_board_ids(request.user)
+        if board is not None:
+            board_ids = [board] if board in board_ids else []
+
+        revisions = board_revisions(board_ids)
+        etag = snapshot_etag(revisions, column)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return HttpResponseNotModified(headers=headers)
+
+        cached = local_cache.get(etag)
+        if cached is None:
+            rows = []
+            for board_id, board_revision in revisions.items():
+                rows.extend(board_snapshot(board_id, board_revision, lambda: load_board_rows(board_id)))
+            if column:
+                rows = [row for row in rows if row["status"] == column]
+            rows.sort(key=lambda row: (row["status"], row["order"], row["id"]))
+            cached = (rows, JSONRenderer().render(rows))
+            local_cache.set(etag, cached)
+
+        rows, body = cached
+        return PrerenderedResponse(rows, body, headers=headers)
+
+    def invalidate_boards(self, board_ids):
+        """
+        一覧のスナップショットを無効にする。
+
+        コミット前に読んだ古い内容が新しいリビジョンで保存されないよう、コミット後にもう一度進める。
+        """
+        board_ids = set(board_ids)
+        for board_id in board_ids:
+            bump_board_revision(board_id)
+        transaction.on_commit(lambda: [bump_board_revision(board_id) for board_id in board_ids])
 
     def perform_create(self, serializer):
-        task = serializer.save(user=self.request.user)
+        # 新しいタスクはカラムの末尾に追加する
+        task_status = serializer.validated_data.get("status", "todo")
+        board = serializer.validated_data.get("board")
+        task = serializer.save(
+            user=self.request.user,
+            order=next_order(task_status, board.id if board else None),
+        )
+        self.invalidate_boards([task.board_id])
         self.broadcast_task_update(task)
-        notify_task_created(task)
+        defer("notify", notify_task_created, task)
 
     def perform_update(self, serializer):
-        task = self.get_object()
+        # DRF が読み込んだインスタンス（ユーザーは select_related 済み）をそのまま使う
+        task = serializer.instance
         request_user = self.request.user
-        is_owner = task.user == request_user
+        is_owner = task.user_id == request_user.id
 
         validated = serializer.validated_data
 
+        if "board" in validated and getattr(validated["board"], "id", None) != task.board_id:
+            raise ValidationError({"error": "タスクを別のボードへ移すことはできません。"})
+
+        if "title" in validated and not is_owner:
+            raise PermissionDenied("タスク名を変更できるのは作成者だけです。")
+        # save で書き換わる前の値
+        old_title = task.title
+        old_status = task.status
+
+        # 版が違えば VersionConflict（409）になる
+        updated_task = serializer.save(expected_version=requested_version(self.request))
+
         if "title" in validated:
-            if not is_owner:
-                raise PermissionDenied("タスク名を変更できるのは作成者だけです。")
-            old_title = task.title
-            new_title = validated["title"]
-            notify_task_title_updated(old_title, new_title, request_user.username)
+            defer("notify", notify_task_title_updated, old_title, validated["title"], request_user.username)
 
-        updated_task = serializer.save()
+        if "status" in validated and validated["status"] == "done" and old_status != "done":
+            defer("notify", notify_task_done, updated_task)
 
-        if "status" in validated and validated["status"] == "done" and task.status != "done":
-            notify_task_done(updated_task)
-        
+        self.invalidate_boards([updated_task.board_id])
         self.broadcast_task_update(updated_task)
 
     def perform_destroy(self, instance):
-        is_owner = instance.user == self.request.user
+        is_owner = instance.user_id == self.request.user.id
 
         if not is_owner:
             raise PermissionDenied("このタスクを削除できるのは作成者だけです。")
 
         task_title = instance.title
         task_id = instance.id
-        instance.delete()
+        board_id = instance.board_id
+        expected_version = requested_version(self.request)
+        if expected_version is None:
+            expected_version = instance.version
+        delete_task(task_id, board_id, expected_version)
 
-        from .slack_notifier import send_slack_notification
         message = f"タスク「{task_title}」(ID: {task_id}) が削除されました。\n削除者: @{self.request.user.username}"
-        send_slack_notification(message, title="🗑️ タスク削除", color="#d32f2f")
-
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "tasks_all",
-            {
-                "type": "task_delete",
-                "task_id": task_id,
-            }
+        defer("notify", send_slack_notification, message, "🗑️ タスク削除", "#d32f2f")
+
+        self.invalidate_boards([board_id])
+        defer("task_delete", task_id, board_id)
+
+    @action(detail=False, methods=["get"])
+    def changes(self, request):
+        """
+        since（ISO 8601）以降に変更・削除されたタスクを返す（差分同期）。
+
+        {"cursor": ..., "has_more": bool, "upserts": [タスク], "deletes": [id]}
+        次回は返された cursor を since に渡す。日時だけの since はコミットの遅れで
+        取りこぼさないよう CHANGES_OVERLAP だけ遡って読むので、同じタスクが重複して返ることがある。
+        has_more のときの cursor は "日時,id" で、次のページは最後に返した行の直後から読む
+        （同じ時刻に limit 件以上変更されていても先へ進む）。
+        """
+        since, after_id = parse_changes_cursor(request.query_params.get("since"))
+        if since is None:
+            return Response({"error": "since is required (ISO 8601)"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(int(request.query_params.get("limit", CHANGES_DEFAULT_LIMIT)), CHANGES_MAX_LIMIT)
+            limit = max(1, limit)
+        except ValueError:
+            return Response({"error": "invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        retention = datetime.timedelta(days=getattr(settings, "TASK_TOMBSTONE_RETENTION_DAYS", 30))
+        if since < now - retention:
+            # 削除の記録が残っていないので全件を取り直してもらう
+            return Response({"error": "since is too old, fetch the full list"}, status=status.HTTP_410_GONE)
+
+        if after_id is None:
+            window_start = since - CHANGES_OVERLAP
+            after = Q(updated_at__gt=window_start)
+        else:
+            # ページの続き: 前のページの最後の行 (updated_at, id) より後ろから読む
+            window_start = since
+            after = Q(updated_at__gt=since) | Q(updated_at=since, id__gt=after_id)
+        tasks = list(
+            visible_tasks(request.user)
+            .select_related("user")
+            .filter(after, updated_at__lte=now)
+            .order_by("updated_at", "id")[:limit + 1]
+        )
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+        cursor = tasks[-1].updated_at if has_more else now
+
+        deletes = (
+            visible_tasks(request.user, model=TaskTombstone)
+            .filter(deleted_at__gt=window_start, deleted_at__lte=cursor)
+            .order_by("deleted_at")
+            .values_list("task_id", flat=True)
         )
 
+        return Response({
+            "cursor": f"{cursor.isoformat()},{tasks[-1].id}" if has_more else cursor.isoformat(),
+            "has_more": has_more,
+            "upserts": self.get_serializer(tasks, many=True).data,
+            "deletes": list(deletes),
+        })
+
     @action(detail=False, methods=["post"])
     def reorder(self, request):
         task_id = request.data.get("task_id")
@@ -82,89 +411,104 @@ class TaskViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        # new_status should be one of the status keys (strings)
+        valid_statuses = [s[0] for s in Task.STATUS_CHOICES]
+        if new_status not in valid_statuses:
+            return Response({"error": "invalid status"}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            with transaction.atomic():
-                task = Task.objects.select_for_update().get(id=task_id)
-
-                is_owner = (task.user == request.user)
-                is_admin = request.user.is_staff
-
-                # new_status should be one of the status keys (strings)
-                valid_statuses = [s[0] for s in Task.STATUS_CHOICES]
-                if new_status not in valid_statuses:
-                    return Response({"error": "invalid status"}, status=status.HTTP_400_BAD_REQUEST)
-
-                try:
-                    new_order = int(new_order)
-                except (TypeError, ValueError):
-                    return Response({"error": "invalid order"}, status=status.HTTP_400_BAD_REQUEST)
-
-                old_status = task.status
-
-                if not is_owner and not is_admin:
-                    return Response(
-                        {"error": "他のユーザーのタスクは移動できません。"},
-                        status=status.HTTP_403_FORBIDDEN,
-                    )
-
-                if is_admin and not is_owner and new_status != old_status:
-                    return Response(
-                        {"error": "管理者でも、他のユーザーのタスクを別のカラムへは移動できません。"},
-                        status=status.HTTP_403_FORBIDDEN,
-                    )
-
-                task.status = new_status
-                task.save()
-
-                if new_status == "done" and old_status != "done":
-                    notify_task_done(task)
-                tasks_same_column = (
-                    Task.objects
-                    .filter(status=new_status)
-                    .order_by("order")
+            new_order = int(new_order)
+        except (TypeError, ValueError):
+            return Response({"error": "invalid order"}, status=status.HTTP_400_BAD_REQUEST)
+
+        expected_version = requested_version(request)
+
+        # 行ロックは取らず、版を確認して保存する。版を指定されていなければ読み直して再試行する
+        for attempt in range(REORDER_ATTEMPTS):
+            try:
+                task = visible_tasks(request.user).select_related("user").get(id=task_id)
+            except Task.DoesNotExist:
+                return Response({"error": "task not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            is_owner = task.user_id == request.user.id
+            is_admin = request.user.is_staff
+            old_status = task.status
+
+            if not is_owner and not is_admin:
+                return Response(
+                    {"error": "他のユーザーのタスクは移動できません。"},
+                    status=status.HTTP_403_FORBIDDEN,
                 )
 
-                tasks_same_column = [t for t in tasks_same_column if t.id != task.id]
+            if is_admin and not is_owner and new_status != old_status:
+                return Response(
+                    {"error": "管理者でも、他のユーザーのタスクを別のカラムへは移動できません。"},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
 
-                if new_order < 0:
-                    new_order = 0
-                if new_order > len(tasks_same_column):
-                    new_order = len(tasks_same_column)
+            if expected_version is not None and task.version != expected_version:
+                raise VersionConflict(task.id)
 
-                tasks_same_column.insert(new_order, task)
+            try:
+                # 前後のタスクのランクの間に入れる（通常は移動したタスクのみ更新）
+                moved = place_task(task, new_status, new_order)
+            except VersionConflict:
+                if expected_version is not None or attempt == REORDER_ATTEMPTS - 1:
+                    raise
+                continue
+            break
 
-                for i, t in enumerate(tasks_same_column):
-                    t.order = i
-                    t.save()
-        except Task.DoesNotExist:
-            return Response({"error": "task not found"}, status=status.HTTP_404_NOT_FOUND)
+        if new_status == "done" and old_status != "done":
+            defer("notify", notify_task_done, task)
 
-        self.broadcast_all_tasks()
-        return Response({"status": "ok"})
+        self.invalidate_boards([task.board_id])
+        self.broadcast_task_move(moved, task.board_id)
+        return Response({"status": "ok", "moved": moved})
 
-    def broadcast_task_update(self, task):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "tasks_all",
-            {
-                "type": "task_update",
-                "task": TaskSerializer(task).data,
-            }
-        )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """作成・更新・移動・削除をまとめて 1 トランザクションで実行する"""
+        try:
+            result = apply_bulk_operations(
+                request.user,
+                request.data.get("operations"),
+                visible_tasks(request.user),
+                self.get_serializer_context(),
+            )
+        except BulkOperationError as e:
+            return Response({"error": e.message, "index": e.index}, status=e.status_code)
 
-    def broadcast_all_tasks(self):
-        channel_layer = get_channel_layer()
-        tasks = TaskSerializer(
-            Task.objects.all().order_by("status", "order"),
-            many=True
-        ).data
-
-        async_to_sync(channel_layer.group_send)(
-            "tasks_all",
-            {
-                "type": "task_bulk_update",
-                "tasks": tasks,
-            }
+        self.invalidate_boards(
+            t.board_id for t in list(result.updated) + list(result.created) + list(result.deleted)
         )
+        self.invalidate_boards(row["board"] for row in result.moved)
+        self.broadcast_batch(result)
+        defer("notify", notify_bulk_operations, result.counts(), request.user.username)
+
+        return Response({
+            **result.counts(),
+            "created_ids": [t.id for t in result.created],
+        })
+
+    def broadcast_batch(self, result):
+        """一括操作の結果を記録する（ボードごとに 1 つの task_batch イベントになる）"""
+        for task in list(result.updated) + list(result.created):
+            self.broadcast_task_update(task)
+
+        moved_by_board = {}
+        for row in result.moved:
+            board_id = row.pop("board")
+            moved_by_board.setdefault(board_id, []).append(row)
+        for board_id, rows in moved_by_board.items():
+            self.broadcast_task_move(rows, board_id)
+
+        for task in result.deleted:
+            defer("task_delete", task.id, task.board_id)
 
+    def broadcast_task_update(self, task):
+        # 配信はカード形式（本文は開いたクライアントが取得する）
+        defer("task_update", TaskCardSerializer(task).data, task.board_id)
 
+    def broadcast_task_move(self, rows, board_id=None):
+        """並び替えで変わった行（id, status, order）だけを配信する"""
+        defer("task_move", rows, board_id)
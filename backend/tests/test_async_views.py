@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tasks.models import Board, Task, TaskTombstone
+
+
+@pytest.fixture
+def owner(create_user):
+    return create_user(username="owner", email="owner@example.com")
+
+
+class TokenClient(AsyncClient):
+    """Authorization ヘッダーを毎回付ける AsyncClient（コンストラクタの headers は ASGI では効かない）"""
+
+    def __init__(self, token):
+        super().__init__()
+        self.token = token
+
+    def generic(self, *args, headers=None, **kwargs):
+        headers = {"Authorization": f"Bearer {self.token}", **(headers or {})}
+        return super().generic(*args, headers=headers, **kwargs)
+
+
+def client_for(user):
+    return TokenClient(AccessToken.for_user(user))
+
+
+def client_for_sync(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def body(response):
+    return json.loads(response.content)
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_requests_without_token_are_rejected():
+    assert (await AsyncClient().get("/api/async/tasks/")).status_code == 401
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_crud_matches_the_sync_api(owner, channel_layer):
+    client = client_for(owner)
+    listener = await channel_layer.new_channel()
+    await channel_layer.group_add("tasks_all", listener)
+
+    res = await client.post("/api/async/tasks/", {"title": "A", "status": "todo"}, content_type="application/json")
+    assert res.status_code == 201
+    created = body(res)
+    assert created["username"] == "owner"
+    assert created["order"] == 1024
+    assert json.loads((await channel_layer.receive(listener))["text"])["task"]["title"] == "A"
+
+    res = await client.patch(
+        f"/api/async/tasks/{created['id']}/", {"title": "B"}, content_type="application/json", headers={"If-Match": '"1"'},
+    )
+    assert body(res)["version"] == 2
+    assert json.loads((await channel_layer.receive(listener))["text"])["task"]["title"] == "B"
+
+    res = await client.patch(
+        f"/api/async/tasks/{created['id']}/", {"title": "C"}, content_type="application/json", headers={"If-Match": '"1"'},
+    )
+    assert res.status_code == 409
+    assert body(res)["task"]["title"] == "B"
+
+    listing = await client.get("/api/async/tasks/")
+    assert [t["title"] for t in body(listing)] == ["B"]
+    sync_listing = await sync_to_async(client_for_sync(owner).get)("/api/tasks/")
+    assert sync_listing["ETag"] == listing["ETag"]
+    assert (await client.get("/api/async/tasks/", headers={"If-None-Match": listing["ETag"]})).status_code == 304
+
+    res = await client.delete(f"/api/async/tasks/{created['id']}/")
+    assert res.status_code == 204
+    deleted = json.loads((await channel_layer.receive(listener))["text"])
+    assert (deleted["type"], deleted["task_id"]) == ("task_delete", created["id"])
+    assert await TaskTombstone.objects.filter(task_id=created["id"]).aexists()
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_reorder_and_permissions(owner, create_user):
+    other = await sync_to_async(create_user)(username="other", email="other@example.com")
+    tasks = [await Task.objects.acreate(user=owner, title=f"T{i}", order=(i + 1) * 1024) for i in range(3)]
+
+    res = await client_for(owner).post(
+        "/api/async/tasks/reorder/", {"task_id": tasks[2].id, "status": "todo", "order": 0}, content_type="application/json",
+    )
+    assert res.status_code == 200
+    assert [t.id async for t in Task.objects.order_by("order")] == [tasks[2].id, tasks[0].id, tasks[1].id]
+
+    res = await client_for(other).post(
+        "/api/async/tasks/reorder/", {"task_id": tasks[0].id, "status": "done", "order": 0}, content_type="application/json",
+    )
+    assert res.status_code == 403
+    res = await client_for(other).patch(
+        f"/api/async/tasks/{tasks[0].id}/", {"title": "mine"}, content_type="application/json",
+    )
+    assert res.status_code == 403
+    assert (await client_for(other).delete(f"/api/async/tasks/{tasks[0].id}/")).status_code == 403
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_board_tasks_require_membership(owner, create_user):
+    outsider = await sync_to_async(create_user)(username="outsider", email="outsider@example.com")
+    board = await Board.objects.acreate(name="Team", owner=owner)
+    await board.members.aadd(owner)
+
+    res = await client_for(outsider).post(
+        "/api/async/tasks/", {"title": "x", "board": board.id}, content_type="application/json",
+    )
+    assert res.status_code == 400
+    res = await client_for(owner).post(
+        "/api/async/tasks/", {"title": "x", "board": board.id}, content_type="application/json",
+    )
+    assert res.status_code == 201
+    assert body(await client_for(outsider).get("/api/async/tasks/", {"board": board.id})) == []
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tasks.consumers import TaskConsumer
+from tasks.models import Board, Task
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def members(create_user):
+    alice = create_user(username="alice", email="alice@example.com")
+    bob = create_user(username="bob", email="bob@example.com")
+    board = Board.objects.create(name="Team A")
+    board.members.add(alice)
+    return alice, bob, board
+
+
+@pytest.mark.django_db
+def test_board_tasks_are_visible_to_members_only(members):
+    alice, bob, board = members
+    res = client_for(alice).post("/api/tasks/", data={"title": "secret", "status": "todo", "board": board.id})
+    assert res.status_code == 201
+
+    assert [t["title"] for t in client_for(alice).get("/api/tasks/", {"board": board.id}).data] == ["secret"]
+    assert client_for(bob).get("/api/tasks/").data == []
+    assert client_for(bob).get(f"/api/tasks/{res.data['id']}/").status_code == 404
+    # メンバーでないボードにはタスクを作れない
+    assert client_for(bob).post("/api/tasks/", data={"title": "x", "board": board.id}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_task_events_go_to_board_group_only(members, channel_layer, django_capture_on_commit_callbacks):
+    alice, _, board = members
+    shared = async_to_sync(channel_layer.new_channel)()
+    team = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)("tasks_all", shared)
+    async_to_sync(channel_layer.group_add)(f"board_{board.id}", team)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client_for(alice).post("/api/tasks/", data={"title": "team task", "board": board.id})
+
+    message = async_to_sync(channel_layer.receive)(team)
+    assert json.loads(message["text"])["task"]["title"] == "team task"
+    assert shared not in channel_layer.channels
+
+
+@pytest.mark.django_db
+def test_columns_are_ordered_per_board(members):
+    alice, _, board = members
+    client = client_for(alice)
+    client.post("/api/tasks/", data={"title": "shared", "status": "todo"})
+    res = client.post("/api/tasks/", data={"title": "team", "status": "todo", "board": board.id})
+
+    # 別ボードのタスクとは並び順を共有しないので、どちらもカラムの先頭になる
+    assert Task.objects.get(id=res.data["id"]).order == Task.objects.get(title="shared").order
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_subscribe_requires_membership(members, channel_layer):
+    alice, bob, board = members
+
+    async def connect(user):
+        communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), "/ws/tasks/")
+        await communicator.connect()
+        await communicator.send_json_to({"type": "auth", "token": str(AccessToken.for_user(user))})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"type": "subscribe", "board": board.id})
+        return communicator, await communicator.receive_json_from()
+
+    member, reply = await connect(alice)
+    assert reply == {"type": "subscribed", "board": board.id}
+    outsider, reply = await connect(bob)
+    assert reply["type"] == "error"
+
+    await sync_to_async(client_for(alice).post)("/api/tasks/", data={"title": "live", "board": board.id})
+    assert (await member.receive_json_from())["task"]["title"] == "live"
+    assert await outsider.receive_nothing()
+
+    await member.disconnect()
+    await outsider.disconnect()
+
+
+@pytest.mark.django_db
+def test_only_owner_can_manage_board(create_user):
+    alice = create_user(username="alice", email="alice@example.com")
+    bob = create_user(username="bob", email="bob@example.com")
+    board_id = client_for(alice).post("/api/boards/", data={"name": "Team B"}).data["id"]
+    board = Board.objects.get(id=board_id)
+    board.members.add(bob)
+
+    assert client_for(bob).patch(f"/api/boards/{board_id}/", data={"members": [bob.id]}).status_code == 403
+    assert client_for(bob).delete(f"/api/boards/{board_id}/").status_code == 403
+    assert set(board.members.all()) == {alice, bob}
+
+    # タスクが残っているボードは作成者でも削除できない
+    client_for(bob).post("/api/tasks/", data={"title": "bob's", "board": board_id})
+    assert client_for(alice).delete(f"/api/boards/{board_id}/").status_code == 400
+    assert Task.objects.filter(board=board).count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_removed_member_stops_receiving_board_events(members, channel_layer):
+    alice, _, board = members
+    communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), "/ws/tasks/")
+    await communicator.connect()
+    await communicator.send_json_to({"type": "auth", "token": str(AccessToken.for_user(alice))})
+    await communicator.receive_json_from()
+    await communicator.send_json_to({"type": "subscribe", "board": board.id})
+    await communicator.receive_json_from()
+
+    await sync_to_async(board.members.remove)(alice)
+    assert await communicator.receive_json_from() == {"type": "unsubscribed", "board": board.id}
+
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_resume_requests_resnapshot_for_unsubscribed_member_board(members, channel_layer):
+    from tasks.events import get_event_log
+
+    alice, _, board = members
+    since = get_event_log().current_revision()
+    await sync_to_async(client_for(alice).post)("/api/tasks/", data={"title": "missed", "board": board.id})
+
+    communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), "/ws/tasks/")
+    await communicator.connect()
+    await communicator.send_json_to({"type": "auth", "token": str(AccessToken.for_user(alice))})
+    await communicator.receive_json_from()
+
+    # ボードを購読し直さずに resume すると差分は返せない
+    await communicator.send_json_to({"type": "resume", "since": since})
+    assert (await communicator.receive_json_from())["type"] == "resnapshot"
+
+    # boards を渡せば購読し直してから再送する
+    await communicator.send_json_to({"type": "resume", "since": since, "boards": [board.id]})
+    assert (await communicator.receive_json_from())["task"]["title"] == "missed"
+    assert (await communicator.receive_json_from())["type"] == "resumed"
+
+    await communicator.disconnect()
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import transaction
+
+from tasks import broadcast
+from tasks.broadcast import BoardChanges, BroadcastTicker, defer, deferred_broadcasts
+
+
+@pytest.fixture
+def listener(channel_layer):
+    def listen(group="tasks_all"):
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(group, channel)
+        return channel
+
+    def messages(channel):
+        received = []
+        while channel in channel_layer.channels:
+            received.append(json.loads(async_to_sync(channel_layer.receive)(channel)["text"]))
+        return received
+
+    listen.messages = messages
+    return listen
+
+
+@pytest.mark.django_db
+def test_rolled_back_changes_are_not_broadcast(listener, django_capture_on_commit_callbacks):
+    channel = listener()
+    with django_capture_on_commit_callbacks(execute=True):
+        with deferred_broadcasts():
+            try:
+                with transaction.atomic():
+                    defer("task_update", {"id": 1, "title": "rolled back"}, None)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            defer("task_delete", 2, None)
+
+    assert [(m["type"], m.get("task_id")) for m in listener.messages(channel)] == [("task_delete", 2)]
+
+
+@pytest.mark.django_db
+def test_latest_update_of_a_task_wins(listener, django_capture_on_commit_callbacks):
+    channel = listener()
+    with django_capture_on_commit_callbacks(execute=True):
+        with deferred_broadcasts():
+            defer("task_update", {"id": 1, "title": "first", "status": "todo", "order": 1024}, None)
+            defer("task_move", [{"id": 1, "status": "done", "order": 2048}], None)
+            defer("task_update", {"id": 1, "title": "last", "status": "done", "order": 2048}, None)
+
+    [message] = listener.messages(channel)
+    assert message["type"] == "task_update"
+    assert message["task"] == {"id": 1, "title": "last", "status": "done", "order": 2048}
+
+
+@pytest.mark.django_db
+def test_one_batch_per_board(listener, django_capture_on_commit_callbacks):
+    shared = listener()
+    team = listener("board_7")
+    with django_capture_on_commit_callbacks(execute=True):
+        with deferred_broadcasts():
+            defer("task_update", {"id": 1, "title": "a"}, None)
+            defer("task_update", {"id": 2, "title": "b"}, 7)
+            defer("task_move", [{"id": 3, "status": "todo", "order": 0}], 7)
+            defer("task_delete", 1, None)
+
+    assert [m["type"] for m in listener.messages(shared)] == ["task_delete"]
+    [batch] = listener.messages(team)
+    assert batch["type"] == "task_batch"
+    assert [e["type"] for e in batch["events"]] == ["task_update", "task_move"]
+
+
+def changes(update=None, move=None, delete=None):
+    result = BoardChanges()
+    if update:
+        result.update(update)
+    if move:
+        result.move(move)
+    if delete:
+        result.delete(delete)
+    return result
+
+
+async def test_ticker_sends_idle_boards_at_once_and_merges_bursts(monkeypatch):
+    sent = []
+
+    async def record(event, group):
+        sent.append((time.monotonic(), group, event))
+
+    monkeypatch.setattr(broadcast, "apublish_event", record)
+    ticker = BroadcastTicker(window=0.2)
+
+    async def wait_for(count):
+        deadline = time.monotonic() + 2
+        while len(sent) < count and time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+        assert len(sent) == count
+
+    assert ticker.offer(None, changes(update={"id": 1, "title": "a"})) is None
+    await wait_for(1)
+
+    # 送信直後の変更はウィンドウの終わりまでまとめる（同じタスクは最後の状態）
+    ticker.offer(None, changes(update={"id": 1, "title": "b"}))
+    ticker.offer(None, changes(move=[{"id": 2, "status": "done", "order": 2048}]))
+    # 同期ビューのスレッドから渡された変更も同じループで送る
+    await sync_to_async(ticker.offer)(None, changes(update={"id": 1, "title": "c"}))
+    ticker.offer(None, changes(delete=3))
+    # 他のボードは待たされない
+    ticker.offer(7, changes(update={"id": 9, "title": "team"}))
+    await wait_for(3)
+
+    (first_at, _, first), (_, team_group, team), (batch_at, group, batch) = sent
+    assert first == {"type": "task_update", "task": {"id": 1, "title": "a"}}
+    assert (team_group, team["task"]["title"]) == ("board_7", "team")
+    assert group == "tasks_all"
+    assert batch == {"type": "task_batch", "events": [
+        {"type": "task_update", "task": {"id": 1, "title": "c"}},
+        {"type": "task_move", "tasks": [{"id": 2, "status": "done", "order": 2048}]},
+        {"type": "task_delete", "task_id": 3},
+    ]}
+    assert batch_at - first_at >= 0.19
+
+
+def test_ticker_outside_an_event_loop_sends_synchronously(monkeypatch):
+    sent = []
+    monkeypatch.setattr(broadcast, "publish_event", lambda event, group: sent.append(event))
+    monkeypatch.setattr(broadcast, "_ticker", BroadcastTicker(window=0.05))
+
+    broadcast.broadcast(None, changes(update={"id": 1, "title": "a"}))
+    broadcast.broadcast(None, changes(update={"id": 1, "title": "b"}))
+
+    assert [e["task"]["title"] for e in sent] == ["a", "b"]
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_coalesced_broadcasts_reach_sockets_through_the_asgi_app(create_user, channel_layer, settings, monkeypatch):
+    from channels.testing import HttpCommunicator, WebsocketCommunicator
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from core.asgi import application
+
+    settings.ALLOWED_HOSTS = ["localhost"]
+    monkeypatch.setattr(broadcast, "_ticker", BroadcastTicker(window=0.05))
+    user = await sync_to_async(create_user)(username="tick", email="tick@example.com")
+    token = str(AccessToken.for_user(user))
+
+    # Origin の確認（ALLOWED_HOSTS は import 時に読まれる）の内側の JWT ミドルウェア + consumer につなぐ
+    socket = WebsocketCommunicator(application.application_mapping["websocket"].application, "/ws/tasks/")
+    assert (await socket.connect())[0]
+    await socket.send_json_to({"type": "auth", "token": token})
+    assert (await socket.receive_json_from())["type"] == "authenticated"
+
+    async def post(title):
+        body = json.dumps({"title": title, "status": "todo"}).encode()
+        http = HttpCommunicator(application, "POST", "/api/tasks/", body=body, headers=[
+            (b"host", b"localhost"),
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ])
+        response = await http.get_response(timeout=10)
+        await http.wait(timeout=10)
+        assert response["status"] == 201
+
+    # 同期ビュー（スレッド）からの 2 回目はウィンドウ内なのでまとめて送られる
+    await post("A")
+    await post("B")
+
+    titles = []
+    while len(titles) < 2:
+        message = await socket.receive_json_from(timeout=2)
+        events = message["events"] if message["type"] == "task_batch" else [message]
+        titles.extend(e["task"]["title"] for e in events if e["type"] == "task_update")
+    assert titles == ["A", "B"]
+
+    await socket.disconnect()
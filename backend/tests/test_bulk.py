@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from rest_framework.test import APIClient
+
+from tasks import slack_notifier
+from tasks.models import Task
+from tasks.slack_notifier import SlackDispatcher
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def tasks(create_user):
+    user = create_user(username="bulk", email="bulk@example.com")
+    client = client_for(user)
+    ids = [client.post("/api/tasks/", data={"title": f"T{i}", "status": "todo"}).data["id"] for i in range(3)]
+    return user, client, ids
+
+
+@pytest.mark.django_db
+def test_bulk_applies_all_operations(tasks):
+    _, client, ids = tasks
+    res = client.post("/api/tasks/bulk/", data={"operations": [
+        {"op": "create", "title": "new 1", "status": "done"},
+        {"op": "create", "title": "new 2", "status": "done"},
+        {"op": "update", "id": ids[0], "title": "renamed"},
+        {"op": "move", "id": ids[1], "status": "in_progress", "order": 0},
+        {"op": "delete", "id": ids[2]},
+    ]}, format="json")
+    assert res.status_code == 200
+    assert {k: res.data[k] for k in ("created", "updated", "moved", "deleted")} == {
+        "created": 2, "updated": 1, "moved": 1, "deleted": 1,
+    }
+
+    assert Task.objects.get(id=ids[0]).title == "renamed"
+    assert Task.objects.get(id=ids[1]).status == "in_progress"
+    assert not Task.objects.filter(id=ids[2]).exists()
+
+    created = Task.objects.filter(id__in=res.data["created_ids"]).order_by("order")
+    assert [t.title for t in created] == ["new 1", "new 2"]
+    assert created[0].order < created[1].order
+
+
+@pytest.mark.django_db
+def test_bulk_broadcasts_one_batch_event(tasks, channel_layer, django_capture_on_commit_callbacks):
+    _, client, ids = tasks
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)("tasks_all", channel)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post("/api/tasks/bulk/", data={"operations": [
+            {"op": "update", "id": ids[0], "status": "done"},
+            {"op": "move", "id": ids[1], "status": "todo", "order": 0},
+            {"op": "delete", "id": ids[2]},
+        ]}, format="json")
+
+    message = async_to_sync(channel_layer.receive)(channel)
+    assert message["type"] == "task_batch"
+    events = json.loads(message["text"])["events"]
+    assert [e["type"] for e in events] == ["task_update", "task_move", "task_delete"]
+    assert events[2]["task_id"] == ids[2]
+    assert channel not in channel_layer.channels
+
+
+@pytest.mark.django_db
+def test_bulk_rolls_back_on_invalid_operation(tasks):
+    _, client, ids = tasks
+    res = client.post("/api/tasks/bulk/", data={"operations": [
+        {"op": "update", "id": ids[0], "title": "renamed"},
+        {"op": "move", "id": ids[1], "status": "nope", "order": 0},
+    ]}, format="json")
+    assert res.status_code == 400
+    assert res.data["index"] == 1
+    assert Task.objects.get(id=ids[0]).title == "T0"
+
+
+@pytest.mark.django_db
+def test_bulk_enforces_task_permissions(tasks, create_user):
+    _, _, ids = tasks
+    other = client_for(create_user(username="other", email="other@example.com"))
+    res = other.post("/api/tasks/bulk/", data={"operations": [
+        {"op": "delete", "id": ids[0]},
+    ]}, format="json")
+    assert res.status_code == 403
+    assert res.data["index"] == 0
+    assert Task.objects.filter(id=ids[0]).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_sends_one_slack_summary(tasks, slack_webhook, monkeypatch, django_capture_on_commit_callbacks):
+    dispatcher = SlackDispatcher(batch_window=0)
+    monkeypatch.setattr(slack_notifier, "_dispatcher", dispatcher)
+    _, client, ids = tasks
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post("/api/tasks/bulk/", data={"operations": [
+            {"op": "create", "title": f"n{i}", "status": "todo"} for i in range(5)
+        ] + [{"op": "delete", "id": ids[0]}]}, format="json")
+    assert dispatcher.flush(timeout=5)
+
+    assert len(slack_webhook.requests) == 1
+    assert "作成 5件 / 削除 1件" in slack_webhook.requests[0]["attachments"][0]["text"]
@@ -0,0 +1,105 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from tasks.models import Board, Task, TaskTombstone
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def changes(client, since, **params):
+    return client.get("/api/tasks/changes/", {"since": since.isoformat(), **params})
+
+
+@pytest.mark.django_db
+def test_changes_returns_upserts_and_deletes(auth_client):
+    client, user = auth_client
+    since = timezone.now() - datetime.timedelta(minutes=1)
+    kept = client.post("/api/tasks/", data={"title": "kept", "status": "todo"}).data["id"]
+    removed = client.post("/api/tasks/", data={"title": "removed", "status": "todo"}).data["id"]
+    client.delete(f"/api/tasks/{removed}/")
+
+    res = changes(client, since)
+    assert res.status_code == 200
+    assert [t["id"] for t in res.data["upserts"]] == [kept]
+    assert res.data["deletes"] == [removed]
+    assert res.data["has_more"] is False
+
+
+@pytest.mark.django_db
+def test_changes_pages_with_cursor(auth_client):
+    client, user = auth_client
+    since = timezone.now() - datetime.timedelta(minutes=1)
+    for i in range(3):
+        Task.objects.create(user=user, title=f"T{i}")
+
+    first = changes(client, since, limit=2)
+    assert len(first.data["upserts"]) == 2
+    assert first.data["has_more"] is True
+
+    rest = client.get("/api/tasks/changes/", {"since": first.data["cursor"]})
+    assert "T2" in [t["title"] for t in rest.data["upserts"]]
+
+
+@pytest.mark.django_db
+def test_changes_pages_through_rows_changed_at_the_same_time(auth_client):
+    client, user = auth_client
+    since = timezone.now() - datetime.timedelta(minutes=1)
+    # 一括操作と同じく、同じ時刻付近に limit 件以上変更される
+    created = Task.objects.bulk_create([Task(user=user, title=f"T{i}") for i in range(30)])
+
+    seen = []
+    res = changes(client, since, limit=10)
+    for _ in range(5):
+        seen.extend(t["id"] for t in res.data["upserts"])
+        if not res.data["has_more"]:
+            break
+        res = client.get("/api/tasks/changes/", {"since": res.data["cursor"], "limit": 10})
+
+    assert res.data["has_more"] is False
+    assert sorted(seen) == sorted(t.id for t in created)
+    assert len(seen) == len(set(seen))
+
+
+@pytest.mark.django_db
+def test_changes_clamps_limit(auth_client):
+    client, user = auth_client
+    since = timezone.now() - datetime.timedelta(minutes=1)
+    Task.objects.create(user=user, title="a")
+    Task.objects.create(user=user, title="b")
+
+    for limit in (0, -1):
+        res = changes(client, since, limit=limit)
+        assert res.status_code == 200
+        assert len(res.data["upserts"]) == 1
+        assert res.data["has_more"] is True
+
+
+@pytest.mark.django_db
+def test_changes_hides_other_boards(create_user):
+    alice = create_user(username="alice", email="alice@example.com")
+    bob = create_user(username="bob", email="bob@example.com")
+    board = Board.objects.create(name="Team")
+    board.members.add(alice)
+    since = timezone.now() - datetime.timedelta(minutes=1)
+    Task.objects.create(user=alice, title="secret", board=board)
+    TaskTombstone.objects.create(task_id=999, board=board)
+
+    res = changes(client_for(bob), since)
+    assert res.data["upserts"] == []
+    assert res.data["deletes"] == []
+
+
+@pytest.mark.django_db
+def test_changes_rejects_missing_or_expired_since(auth_client, settings):
+    client, _ = auth_client
+    assert client.get("/api/tasks/changes/").status_code == 400
+
+    settings.TASK_TOMBSTONE_RETENTION_DAYS = 1
+    assert changes(client, timezone.now() - datetime.timedelta(days=2)).status_code == 410
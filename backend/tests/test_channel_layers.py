@@ -0,0 +1,99 @@
+"""
+Redis チャンネルレイヤーでのプロセス間配信のテスト。
+
+デフォルトでは fakeredis の TCP サーバーを立てて使う。本物の Redis
+（docker-compose の redis サービスなど）で確かめる場合は URL を指定する:
+
+    TEST_REDIS_URL=redis://localhost:6379/15 pytest tests/test_channel_layers.py
+"""
+import os
+import threading
+
+import pytest
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.urls import re_path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tasks.consumers import TaskConsumer
+from tasks.middleware import JWTAuthMiddleware
+from tasks.models import Task
+from tasks.views import TaskViewSet
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+class OtherProcessConsumer(TaskConsumer):
+    # 別プロセスを想定し、独立したレイヤーのインスタンス（同じ Redis）を使う
+    channel_layer_alias = "other_process"
+
+
+def asgi_app(consumer):
+    return JWTAuthMiddleware(URLRouter([re_path(r"ws/tasks/$", consumer.as_asgi())]))
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    if TEST_REDIS_URL:
+        yield TEST_REDIS_URL
+        return
+
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def redis_layers(settings, redis_url):
+    config = {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {"hosts": [redis_url], "prefix": "test-fanout"},
+    }
+    settings.CHANNEL_LAYERS = {"default": config, "other_process": config}
+
+
+async def connect(app, user):
+    communicator = WebsocketCommunicator(app, "/ws/tasks/")
+    connected, _ = await communicator.connect()
+    assert connected
+    await communicator.send_json_to({"type": "auth", "token": str(AccessToken.for_user(user))})
+    assert (await communicator.receive_json_from())["type"] == "authenticated"
+    return communicator
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_broadcast_reaches_sockets_on_every_process(redis_layers, create_user):
+    user = await sync_to_async(create_user)(username="fan", email="fan@example.com")
+    task = await Task.objects.acreate(user=user, title="cross-process")
+
+    local = await connect(asgi_app(TaskConsumer), user)
+    remote = await connect(asgi_app(OtherProcessConsumer), user)
+
+    # ビューは default レイヤー（プロセス A）から送信する
+    await sync_to_async(TaskViewSet().broadcast_task_update)(task)
+
+    for communicator in (local, remote):
+        message = await communicator.receive_json_from(timeout=5)
+        assert message["type"] == "task_update"
+        assert message["task"]["title"] == "cross-process"
+        await communicator.disconnect()
+
+
+def test_redis_event_log_detects_trimmed_history(redis_url):
+    from tasks.events import RedisEventLog
+
+    log = RedisEventLog(redis_url, maxlen=3, prefix="test-events")
+    log.clear()
+    for task_id in range(5):
+        log.append({"type": "task_delete", "task_id": task_id})
+
+    assert [e["revision"] for e in log.since(2)] == [3, 4, 5]
+    assert log.since(1) is None
+    assert log.since(5) == []
+    log.clear()
@@ -0,0 +1,88 @@
+import pytest
+
+from tasks.concurrency import VersionConflict
+from tasks.models import Task
+from tasks.ordering import ORDER_GAP, place_task
+
+
+@pytest.fixture
+def task(auth_client):
+    client, _ = auth_client
+    return client.post("/api/tasks/", data={"title": "A", "status": "todo"}).data
+
+
+@pytest.mark.django_db
+def test_retrieve_returns_version_as_etag(auth_client, task):
+    client, _ = auth_client
+    res = client.get(f"/api/tasks/{task['id']}/")
+    assert res["ETag"] == '"1"'
+    assert res.data["version"] == 1
+
+
+@pytest.mark.django_db
+def test_stale_if_match_is_rejected_with_current_state(auth_client, task):
+    client, _ = auth_client
+    assert client.patch(f"/api/tasks/{task['id']}/", data={"title": "B"}, HTTP_IF_MATCH='"1"').data["version"] == 2
+
+    res = client.patch(f"/api/tasks/{task['id']}/", data={"title": "C"}, HTTP_IF_MATCH='"1"')
+    assert res.status_code == 409
+    assert res.data["task"]["title"] == "B"
+    assert res.data["task"]["version"] == 2
+    assert res["ETag"] == '"2"'
+    assert Task.objects.get(id=task["id"]).title == "B"
+
+
+@pytest.mark.django_db
+def test_version_in_body_is_checked(auth_client, task):
+    client, _ = auth_client
+    assert client.patch(f"/api/tasks/{task['id']}/", data={"title": "B", "version": 1}).status_code == 200
+    assert client.patch(f"/api/tasks/{task['id']}/", data={"title": "C", "version": 1}).status_code == 409
+    assert client.patch(f"/api/tasks/{task['id']}/", data={"title": "C", "version": "x"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_stale_delete_is_rejected(auth_client, task):
+    client, _ = auth_client
+    client.patch(f"/api/tasks/{task['id']}/", data={"title": "B"})
+
+    assert client.delete(f"/api/tasks/{task['id']}/", HTTP_IF_MATCH='"1"').status_code == 409
+    assert client.delete(f"/api/tasks/{task['id']}/", HTTP_IF_MATCH='"2"').status_code == 204
+
+
+@pytest.mark.django_db
+def test_reorder_checks_the_requested_version(auth_client, task):
+    client, _ = auth_client
+    res = client.post("/api/tasks/reorder/", data={"task_id": task["id"], "status": "done", "order": 0, "version": 1})
+    assert res.status_code == 200
+    assert res.data["moved"][0]["version"] == 2
+
+    res = client.post("/api/tasks/reorder/", data={"task_id": task["id"], "status": "todo", "order": 0, "version": 1})
+    assert res.status_code == 409
+    assert res.data["task"]["status"] == "done"
+
+
+@pytest.mark.django_db
+def test_move_of_a_stale_instance_conflicts_without_locking(create_user):
+    user = create_user(username="o", email="o@example.com")
+    stale = Task.objects.create(user=user, title="A", order=ORDER_GAP)
+    Task.objects.filter(id=stale.id).update(title="changed elsewhere", version=2)
+
+    with pytest.raises(VersionConflict):
+        place_task(stale, "done", 0)
+    assert Task.objects.get(id=stale.id).status == "todo"
+
+
+@pytest.mark.django_db
+def test_bulk_operation_with_stale_version_fails(auth_client, task):
+    client, _ = auth_client
+    res = client.post("/api/tasks/bulk/", data={"operations": [
+        {"op": "update", "id": task["id"], "title": "B", "version": 1},
+    ]}, format="json")
+    assert res.status_code == 200
+    assert Task.objects.get(id=task["id"]).version == 2
+
+    res = client.post("/api/tasks/bulk/", data={"operations": [
+        {"op": "delete", "id": task["id"], "version": 1},
+    ]}, format="json")
+    assert res.status_code == 409
+    assert res.data["index"] == 0
@@ -0,0 +1,114 @@
+import pytest
+from channels.testing import WebsocketCommunicator
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tasks.consumers import TaskConsumer
+from tasks.events import InMemoryEventLog, get_event_log, publish_event
+
+
+def test_event_log_since_and_trim():
+    log = InMemoryEventLog(maxlen=3)
+    for i in range(5):
+        log.append({"type": "task_delete", "task_id": i})
+
+    assert log.current_revision() == 5
+    assert [e["revision"] for e in log.since(3)] == [4, 5]
+    assert log.since(5) == []
+    # リビジョン 2 の次（3）はまだ残っている
+    assert [e["revision"] for e in log.since(2)] == [3, 4, 5]
+    # リビジョン 2 以前は既に消えている
+    assert log.since(1) is None
+    # 未来のリビジョンは巻き戻りとみなす
+    assert log.since(9) is None
+
+
+@pytest.mark.django_db
+def test_list_returns_board_revision(auth_client, django_capture_on_commit_callbacks):
+    client, _ = auth_client
+    before = get_event_log().current_revision()
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post("/api/tasks/", data={"title": "A", "status": "todo"})
+
+    res = client.get("/api/tasks/")
+    assert int(res["X-Board-Revision"]) == before + 1
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_resume_replays_missed_events(create_user, channel_layer):
+    from asgiref.sync import sync_to_async
+
+    user = await sync_to_async(create_user)(username="ws", email="ws@example.com")
+    log = get_event_log()
+    since = log.current_revision()
+    await sync_to_async(publish_event)({"type": "task_delete", "task_id": 1})
+    await sync_to_async(publish_event)({"type": "task_delete", "task_id": 2})
+
+    communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), "/ws/tasks/")
+    connected, _ = await communicator.connect()
+    assert connected
+
+    await communicator.send_json_to({"type": "auth", "token": str(AccessToken.for_user(user))})
+    authenticated = await communicator.receive_json_from()
+    assert authenticated["revision"] == since + 2
+
+    await communicator.send_json_to({"type": "resume", "since": since})
+    replayed = [await communicator.receive_json_from() for _ in range(2)]
+    assert [e["task_id"] for e in replayed] == [1, 2]
+    assert await communicator.receive_json_from() == {"type": "resumed", "revision": since + 2}
+
+    await communicator.send_json_to({"type": "resume", "since": since + 100})
+    assert (await communicator.receive_json_from())["type"] == "resnapshot"
+
+    await communicator.disconnect()
+
+
+def test_published_events_are_pre_encoded(channel_layer):
+    import json
+    from asgiref.sync import async_to_sync
+
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)("tasks_all", channel)
+
+    publish_event({"type": "task_update", "task": {"id": 7, "title": "タスク"}})
+    message = async_to_sync(channel_layer.receive)(channel)
+
+    assert message["key"] == ["task", 7]
+    assert json.loads(message["text"]) == {
+        "type": "task_update",
+        "task": {"id": 7, "title": "タスク"},
+        "revision": message["revision"],
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_zlib_clients_receive_large_events_as_compressed_frames(create_user, channel_layer, settings):
+    import json
+    import zlib
+    from asgiref.sync import sync_to_async
+
+    settings.WS_COMPRESS_MIN_BYTES = 200
+    user = await sync_to_async(create_user)(username="ws", email="ws@example.com")
+
+    async def connect(encoding):
+        communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), "/ws/tasks/")
+        await communicator.connect()
+        await communicator.send_json_to({"type": "auth", "token": str(AccessToken.for_user(user)), "encoding": encoding})
+        assert (await communicator.receive_json_from())["encoding"] == (encoding if encoding == "zlib" else "json")
+        return communicator
+
+    compressed, plain = await connect("zlib"), await connect("brotli")
+
+    large = {"type": "task_bulk_update", "tasks": [{"id": i, "description": "lorem ipsum " * 10} for i in range(5)]}
+    await sync_to_async(publish_event)(large)
+    await sync_to_async(publish_event)({"type": "task_delete", "task_id": 1})
+
+    frame = await compressed.receive_from()
+    assert isinstance(frame, bytes)
+    assert json.loads(zlib.decompress(frame))["tasks"] == large["tasks"]
+    assert len(frame) < len(await plain.receive_from())
+    # 小さいイベントは圧縮せずテキストで送る
+    assert json.loads(await compressed.receive_from())["task_id"] == 1
+    assert json.loads(await plain.receive_from())["task_id"] == 1
+
+    await compressed.disconnect()
+    await plain.disconnect()
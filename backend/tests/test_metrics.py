@@ -0,0 +1,80 @@
+import pytest
+from channels.testing import WebsocketCommunicator
+from django.test import Client
+
+from tasks import metrics
+from tasks.consumers import TaskConsumer
+
+
+@pytest.fixture
+def enabled_metrics(settings):
+    settings.METRICS_ENABLED = True
+    settings.METRICS_TOKEN = None
+    metrics.clear()
+    yield
+    metrics.clear()
+
+
+def test_disabled_metrics_record_nothing_and_hide_the_endpoint(settings):
+    settings.METRICS_ENABLED = False
+    metrics.clear()
+    metrics.WS_AUTH_FAILURES.inc(reason="timeout")
+    with metrics.GROUP_SEND_SECONDS.time():
+        pass
+
+    assert metrics.WS_AUTH_FAILURES._values == {}
+    assert metrics.GROUP_SEND_SECONDS._values == {}
+    assert Client().get("/metrics").status_code == 404
+
+
+def test_histogram_renders_cumulative_buckets(enabled_metrics):
+    histogram = metrics.Histogram("test_seconds", "test", buckets=(0.1, 1.0))
+    try:
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(3)
+        assert histogram.render()[2:] == [
+            'test_seconds_bucket{le="0.1"} 1',
+            'test_seconds_bucket{le="1.0"} 2',
+            'test_seconds_bucket{le="+Inf"} 3',
+            "test_seconds_count 3",
+            "test_seconds_sum 3.55",
+        ]
+    finally:
+        metrics._registry.remove(histogram)
+
+
+@pytest.mark.django_db
+def test_api_requests_and_broadcasts_are_exported(enabled_metrics, auth_client, django_capture_on_commit_callbacks):
+    client, _ = auth_client
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post("/api/tasks/", data={"title": "A", "status": "todo"})
+    client.get("/api/tasks/")
+
+    body = Client().get("/metrics").content.decode()
+    assert 'tasks_api_request_seconds_count{action="create",method="POST",status="201"} 1' in body
+    assert 'tasks_api_request_seconds_count{action="list",method="GET",status="200"} 1' in body
+    assert "tasks_group_send_seconds_count 1" in body
+    assert "tasks_ws_outbound_connections" in body
+    assert "tasks_ws_token_cache_" in body
+
+
+def test_metrics_token_is_required_when_configured(enabled_metrics, settings):
+    settings.METRICS_TOKEN = "scrape-secret"
+    assert Client().get("/metrics").status_code == 403
+    assert Client().get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret").status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_socket_gauge_and_auth_failures(enabled_metrics):
+    communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), "/ws/tasks/")
+    await communicator.connect()
+    assert metrics.WS_CONNECTIONS._values == {(): 1}
+
+    await communicator.send_json_to({"type": "auth", "token": "not-a-token"})
+    assert (await communicator.receive_json_from())["type"] == "error"
+    assert (await communicator.receive_output())["type"] == "websocket.close"
+    await communicator.disconnect()
+
+    assert metrics.WS_CONNECTIONS._values == {(): 0}
+    assert metrics.WS_AUTH_FAILURES._values == {("invalid_token",): 1}
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tasks.middleware import TokenUserCache, get_token_user_cache, get_user_from_token
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    get_token_user_cache().clear()
+    yield
+    get_token_user_cache().clear()
+
+
+@pytest.mark.django_db
+def test_repeated_token_is_served_from_cache(create_user, django_assert_num_queries):
+    user = create_user(username="cached", email="cached@example.com")
+    token = str(AccessToken.for_user(user))
+
+    with django_assert_num_queries(1):
+        assert async_to_sync(get_user_from_token)(token) == user
+    with django_assert_num_queries(0):
+        assert async_to_sync(get_user_from_token)(token) == user
+
+    stats = get_token_user_cache().stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+@pytest.mark.django_db
+def test_deactivated_user_is_evicted(create_user):
+    user = create_user(username="gone", email="gone@example.com")
+    token = str(AccessToken.for_user(user))
+    async_to_sync(get_user_from_token)(token)
+
+    user.is_active = False
+    user.save()
+
+    assert get_token_user_cache().stats()["size"] == 0
+    assert async_to_sync(get_user_from_token)(token).is_anonymous
+
+
+def test_entries_expire_and_lru_is_bounded():
+    class Stub:
+        def __init__(self, pk):
+            self.pk = pk
+
+    cache = TokenUserCache(maxsize=2, ttl=60)
+    cache.set("a", Stub(1), exp=time.time() + 3600)
+    cache.set("b", Stub(2), exp=time.time() - 1)  # 既に期限切れのトークン
+    assert cache.get("b") is None
+
+    cache.set("c", Stub(3), exp=time.time() + 3600)
+    cache.set("d", Stub(4), exp=time.time() + 3600)
+    assert cache.get("a") is None
+    assert cache.evictions == 1
@@ -0,0 +1,111 @@
+import io
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from tasks.models import Task
+from tasks.ordering import ORDER_GAP, place_task, rebalance_column
+
+
+def column_ids(status="todo"):
+    return list(Task.objects.filter(status=status).order_by("order", "id").values_list("id", flat=True))
+
+
+@pytest.mark.django_db
+def test_create_appends_with_gap(auth_client):
+    client, user = auth_client
+    ids = [client.post("/api/tasks/", data={"title": f"T{i}", "status": "todo"}).data["id"] for i in range(3)]
+
+    orders = list(Task.objects.filter(id__in=ids).order_by("order").values_list("order", flat=True))
+    assert orders == [ORDER_GAP, 2 * ORDER_GAP, 3 * ORDER_GAP]
+
+
+@pytest.mark.django_db
+def test_move_updates_only_moved_row(create_user):
+    user = create_user(username="o", email="o@example.com")
+    tasks = [Task.objects.create(user=user, title=f"T{i}", order=(i + 1) * ORDER_GAP) for i in range(50)]
+    moved = tasks[0]
+
+    with CaptureQueriesContext(connection) as ctx:
+        changed = place_task(moved, "todo", 10)
+
+    updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+    assert len(updates) == 1
+    assert changed == [{"id": moved.id, "status": "todo", "order": moved.order, "version": 2}]
+    assert column_ids().index(moved.id) == 10
+
+
+@pytest.mark.django_db
+def test_exhausted_gap_shifts_the_rest_of_the_column(create_user):
+    user = create_user(username="r", email="r@example.com")
+    a = Task.objects.create(user=user, title="A", order=1)
+    b = Task.objects.create(user=user, title="B", order=2)
+    c = Task.objects.create(user=user, title="C", order=3)
+    d = Task.objects.create(user=user, title="D", order=3)
+    before = dict(Task.objects.values_list("id", "updated_at"))
+
+    changed = place_task(d, "todo", 1)
+
+    assert column_ids() == [a.id, d.id, b.id, c.id]
+    # 移動したタスクとずらした範囲だけが返る（先頭のタスクは変わらない）
+    assert [row["id"] for row in changed] == [d.id, b.id, c.id]
+    assert list(Task.objects.order_by("order", "id").values_list("order", flat=True)) == [
+        1, 1 + ORDER_GAP // 2, 2 + ORDER_GAP, 3 + ORDER_GAP,
+    ]
+    # ずらした行も差分同期に返る（版は変わらない）
+    after = {t.id: t for t in Task.objects.all()}
+    assert after[a.id].updated_at == before[a.id]
+    assert all(after[t.id].updated_at > before[t.id] for t in (b, c, d))
+    assert (after[b.id].version, after[c.id].version) == (1, 1)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", [3, 200])
+def test_shift_cost_does_not_grow_with_column(create_user, size):
+    user = create_user(username="s", email="s@example.com")
+    Task.objects.bulk_create(Task(user=user, title=f"T{i}", order=i) for i in range(size))
+    moved = Task.objects.get(order=size - 1)
+
+    with CaptureQueriesContext(connection) as ctx:
+        changed = place_task(moved, "todo", 1)
+
+    assert len(changed) == size - 1
+    statements = [q["sql"] for q in ctx.captured_queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+    # 前後のランク・ずらす UPDATE・移動したタスクの UPDATE・ずらした範囲の読み込み
+    assert len(statements) == 4
+
+
+@pytest.mark.django_db
+def test_rebalance_column_respreads_ranks(create_user):
+    user = create_user(username="r", email="r@example.com")
+    for order in (5, 6, 5000):
+        Task.objects.create(user=user, title=f"T{order}", order=order)
+
+    assert len(rebalance_column("todo")) == 3
+    assert list(Task.objects.order_by("order").values_list("order", flat=True)) == [
+        ORDER_GAP, 2 * ORDER_GAP, 3 * ORDER_GAP,
+    ]
+    # 振り直し済みのカラムでは何も変わらない
+    assert rebalance_column("todo") == []
+
+
+@pytest.mark.django_db
+def test_rebalance_command_broadcasts_and_marks_rows_changed(create_user, channel_layer, django_capture_on_commit_callbacks):
+    user = create_user(username="r", email="r@example.com")
+    tasks = [Task.objects.create(user=user, title=f"T{order}", order=order) for order in (5, 6)]
+    before = {t.id: t.updated_at for t in tasks}
+
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)("tasks_all", channel)
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("rebalance_task_order", stdout=io.StringIO())
+
+    message = json.loads(async_to_sync(channel_layer.receive)(channel)["text"])
+    assert message["type"] == "task_bulk_update"
+    assert [t["order"] for t in message["tasks"]] == [ORDER_GAP, 2 * ORDER_GAP]
+    # 差分同期にも振り直した行が返るよう updated_at を進める
+    for task in Task.objects.all():
+        assert task.updated_at > before[task.id]
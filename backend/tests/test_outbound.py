@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from tasks.outbound import OutboundQueue, coalesce_key, queue_stats
+
+
+def update(task_id, title):
+    return {"type": "task_update", "task": {"id": task_id, "title": title}}
+
+
+async def test_superseded_updates_for_same_task_are_coalesced():
+    sent = []
+
+    async def send(text):
+        sent.append(json.loads(text))
+
+    queue = OutboundQueue(send, maxsize=10)
+    for event in (update(1, "a"), update(2, "b"), update(1, "c")):
+        queue.put(json.dumps(event), key=coalesce_key(event))
+
+    queue.start()
+    while queue.depth:
+        await asyncio.sleep(0.01)
+    await queue.stop()
+
+    # タスク 1 の古い更新は捨てられ、最新のものがタスク 2 の後に届く
+    assert [(m["task"]["id"], m["task"]["title"]) for m in sent] == [(2, "b"), (1, "c")]
+    assert queue.coalesced == 1
+
+
+async def test_overflow_drops_backlog_and_requests_resnapshot():
+    async def never_send(text):
+        await asyncio.Event().wait()
+
+    queue = OutboundQueue(never_send, maxsize=3)
+    for i in range(5):
+        event = update(i, "x")
+        queue.put(json.dumps(event), key=coalesce_key(event))
+
+    assert queue.resnapshots == 1
+    assert queue.dropped == 3
+    pending = [json.loads(text)["type"] for text in queue._pending.values()]
+    assert pending == ["resnapshot", "task_update", "task_update"]
+
+    stats = queue_stats()
+    assert stats["depth_total"] >= 3
+    await queue.stop()
+
+
+def test_snapshots_are_coalesced_per_board():
+    snapshot = {"type": "task_bulk_update", "tasks": []}
+    assert coalesce_key(snapshot, "board_1") != coalesce_key(snapshot, "board_2")
+    assert coalesce_key(snapshot, "board_1") == coalesce_key(snapshot, "board_1")
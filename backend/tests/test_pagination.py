@@ -0,0 +1,45 @@
+import pytest
+from tasks.models import Task
+
+
+@pytest.fixture
+def board(auth_client):
+    client, user = auth_client
+    for status in ("todo", "in_progress", "done"):
+        for i in range(3):
+            Task.objects.create(user=user, title=f"{status}-{i}", status=status, order=(i + 1) * 1024)
+    return client
+
+
+@pytest.mark.django_db
+def test_list_without_limit_returns_everything(board):
+    res = board.get("/api/tasks/")
+    assert res.status_code == 200
+    assert len(res.data) == 9
+
+
+@pytest.mark.django_db
+def test_cursor_pages_through_board_in_order(board):
+    titles = []
+    res = board.get("/api/tasks/", {"limit": 4})
+    while True:
+        assert res.status_code == 200
+        titles += [t["title"] for t in res.data["results"]]
+        if not res.data["cursor"]:
+            break
+        res = board.get("/api/tasks/", {"limit": 4, "cursor": res.data["cursor"]})
+
+    expected = [t.title for t in Task.objects.order_by("status", "order", "id")]
+    assert titles == expected
+
+
+@pytest.mark.django_db
+def test_status_filter_and_sparse_fields(board):
+    res = board.get("/api/tasks/", {"status": "done", "limit": 2, "fields": "title,status"})
+    assert res.status_code == 200
+    assert [set(t) for t in res.data["results"]] == [{"id", "title", "status"}] * 2
+    assert {t["status"] for t in res.data["results"]} == {"done"}
+    assert res.data["next"] is not None
+
+    assert board.get("/api/tasks/", {"status": "bogus"}).status_code == 400
+    assert board.get("/api/tasks/", {"cursor": "not-a-cursor"}).status_code == 404
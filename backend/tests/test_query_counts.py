@@ -0,0 +1,77 @@
+import pytest
+from rest_framework.test import APIClient
+from tasks.models import Task
+
+
+@pytest.fixture
+def owner(create_user):
+    return create_user(username="owner", email="owner@example.com")
+
+
+@pytest.fixture
+def client(owner):
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return client
+
+
+@pytest.fixture
+def board(owner, create_user):
+    # 作成者が異なるタスクを混ぜて、ユーザーの取得が行ごとに発生しないことを確認する
+    users = [owner] + [create_user(username=f"u{i}", email=f"u{i}@example.com") for i in range(3)]
+    return [
+        Task.objects.create(user=users[i % len(users)], title=f"T{i}", order=(i + 1) * 1024)
+        for i in range(12)
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", [2, 12])
+def test_list_query_count_does_not_grow_with_board(client, owner, size, query_budget):
+    for i in range(size):
+        Task.objects.create(user=owner, title=f"T{i}", order=i)
+
+    # 閲覧できるボードの id + 共有ボードのスナップショット
+    with query_budget(2):
+        res = client.get("/api/tasks/")
+    assert len(res.data) == size
+
+    # スナップショットがキャッシュされていればボードの id だけ
+    with query_budget(1):
+        res = client.get("/api/tasks/")
+    assert len(res.data) == size
+
+
+@pytest.mark.django_db
+def test_create_query_count(client, board, query_budget):
+    with query_budget(2):
+        res = client.post("/api/tasks/", data={"title": "new", "status": "todo"})
+    assert res.status_code == 201
+
+
+@pytest.mark.django_db
+def test_update_query_count(client, board, query_budget, django_capture_on_commit_callbacks):
+    task = board[0]
+    # 取得（ユーザーと一緒に 1 回）+ 版を確認する UPDATE。配信と通知の組み立てでも読み直さない
+    with query_budget(2), django_capture_on_commit_callbacks(execute=True):
+        res = client.patch(f"/api/tasks/{task.id}/", data={"title": "renamed", "status": "done"})
+    assert res.status_code == 200
+    assert res.data["username"] == "owner"
+
+
+@pytest.mark.django_db
+def test_delete_query_count(client, board, query_budget, django_capture_on_commit_callbacks):
+    task = board[0]
+    # 取得 + 削除 + 削除の記録（tombstone）
+    with query_budget(3), django_capture_on_commit_callbacks(execute=True):
+        res = client.delete(f"/api/tasks/{task.id}/")
+    assert res.status_code == 204
+
+
+@pytest.mark.django_db
+def test_reorder_query_count(client, board, query_budget):
+    task = board[0]
+    # タスクの読み込み・前後のランク・版を確認する UPDATE（行ロックもトランザクションも無し）
+    with query_budget(3):
+        res = client.post("/api/tasks/reorder/", data={"task_id": task.id, "status": "todo", "order": 5})
+    assert res.status_code == 200
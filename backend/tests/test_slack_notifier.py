@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from tasks import slack_notifier
+from tasks.slack_notifier import SlackDispatcher
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    dispatcher = SlackDispatcher(batch_window=0.2, backoff=0.01)
+    monkeypatch.setattr(slack_notifier, "_dispatcher", dispatcher)
+    return dispatcher
+
+
+def test_burst_is_coalesced_into_one_message(slack_webhook, dispatcher):
+    for i in range(3):
+        slack_notifier.send_slack_notification(f"message {i}", title="t")
+    assert dispatcher.flush(timeout=5)
+
+    assert len(slack_webhook.requests) == 1
+    payload = slack_webhook.requests[0]
+    assert [a["text"] for a in payload["attachments"]] == ["message 0", "message 1", "message 2"]
+
+
+def test_failed_delivery_is_retried(slack_webhook, dispatcher):
+    slack_webhook.fail_next = 2
+    slack_notifier.send_slack_notification("retry me")
+    assert dispatcher.flush(timeout=5)
+
+    assert [p["attachments"][0]["text"] for p in slack_webhook.requests] == ["retry me"]
+
+
+def test_permanent_error_is_not_retried(slack_webhook, dispatcher):
+    slack_webhook.fail_next = 1
+    slack_webhook.fail_status = 404
+    slack_notifier.send_slack_notification("revoked")
+    assert dispatcher.flush(timeout=5)
+
+    assert slack_webhook.attempts == 1
+    assert slack_webhook.requests == []
+
+
+def test_rate_limit_with_http_date_retry_after(slack_webhook, dispatcher):
+    slack_webhook.fail_next = 1
+    slack_webhook.fail_status = 429
+    slack_webhook.fail_headers = {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    slack_notifier.send_slack_notification("later")
+    assert dispatcher.flush(timeout=5)
+
+    assert [p["attachments"][0]["text"] for p in slack_webhook.requests] == ["later"]
+
+
+@pytest.mark.django_db
+def test_slow_webhook_does_not_block_api(slack_webhook, dispatcher, auth_client, django_capture_on_commit_callbacks):
+    client, _ = auth_client
+    slack_webhook.delay = 1
+
+    started = time.monotonic()
+    with django_capture_on_commit_callbacks(execute=True):
+        res = client.post("/api/tasks/", data={"title": "slow", "status": "todo"})
+    assert res.status_code == 201
+    assert time.monotonic() - started < 0.5
+
+    assert dispatcher.flush(timeout=5)
+    assert "slow" in slack_webhook.requests[0]["attachments"][0]["text"]
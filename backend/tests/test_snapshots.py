@@ -0,0 +1,79 @@
+import pytest
+from rest_framework.test import APIClient
+
+from tasks.models import Board, Task
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.mark.django_db
+def test_unchanged_board_returns_304(auth_client):
+    client, _ = auth_client
+    client.post("/api/tasks/", data={"title": "A", "status": "todo"})
+
+    first = client.get("/api/tasks/")
+    assert first.status_code == 200
+    etag = first["ETag"]
+
+    again = client.get("/api/tasks/", HTTP_IF_NONE_MATCH=etag)
+    assert again.status_code == 304
+    assert again["ETag"] == etag
+    assert "X-Board-Revision" in again
+
+
+@pytest.mark.django_db
+def test_writes_invalidate_the_snapshot(auth_client):
+    client, _ = auth_client
+    task_id = client.post("/api/tasks/", data={"title": "A", "status": "todo"}).data["id"]
+    etag = client.get("/api/tasks/")["ETag"]
+
+    client.patch(f"/api/tasks/{task_id}/", data={"title": "B"})
+    res = client.get("/api/tasks/", HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 200
+    assert [t["title"] for t in res.data] == ["B"]
+
+    client.post("/api/tasks/reorder/", data={"task_id": task_id, "status": "done", "order": 0})
+    assert client.get("/api/tasks/", {"status": "done"}).data[0]["id"] == task_id
+
+    client.delete(f"/api/tasks/{task_id}/")
+    assert client.get("/api/tasks/").data == []
+
+
+@pytest.mark.django_db
+def test_snapshot_is_scoped_to_visible_boards(create_user):
+    alice = create_user(username="alice", email="alice@example.com")
+    bob = create_user(username="bob", email="bob@example.com")
+    board = Board.objects.create(name="Team")
+    board.members.add(alice)
+    client_for(alice).post("/api/tasks/", data={"title": "team", "board": board.id})
+    client_for(alice).post("/api/tasks/", data={"title": "shared"})
+
+    assert [t["title"] for t in client_for(alice).get("/api/tasks/").data] == ["team", "shared"]
+    assert [t["title"] for t in client_for(bob).get("/api/tasks/").data] == ["shared"]
+    assert client_for(bob).get("/api/tasks/", {"board": board.id}).data == []
+    assert client_for(alice).get("/api/tasks/")["ETag"] != client_for(bob).get("/api/tasks/")["ETag"]
+
+
+@pytest.mark.django_db
+def test_sparse_fields_bypass_the_snapshot(auth_client):
+    client, user = auth_client
+    Task.objects.create(user=user, title="A")
+    res = client.get("/api/tasks/", {"fields": "title"})
+    assert res.data == [{"id": res.data[0]["id"], "title": "A"}]
+    assert "ETag" not in res
+
+
+async def test_async_revisions_share_the_sync_counters():
+    from tasks.snapshots import aboard_revisions, abump_board_revision, board_revisions
+
+    first = await aboard_revisions([None, 5])
+    assert first == board_revisions([None, 5])
+
+    await abump_board_revision(5)
+    second = await aboard_revisions([None, 5])
+    assert second[None] == first[None]
+    assert second[5] == first[5] + 1
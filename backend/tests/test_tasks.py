@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from django.urls import reverse
 from tasks.models import Task
@@ -46,3 +48,58 @@ def test_reorder(api_client, create_user):
     # reorder task 0 to position 3
     r2 = client.post("/api/tasks/reorder/", data={"task_id": ids[0], "status": "todo", "order": 3})
     assert r2.status_code == 200
+
+
+@pytest.mark.django_db
+def test_reorder_broadcasts_only_moved_rows(create_user, channel_layer, django_capture_on_commit_callbacks):
+    from asgiref.sync import async_to_sync
+    from rest_framework.test import APIClient
+
+    user = create_user(username="m", email="m@example.com")
+    client = APIClient()
+    client.force_authenticate(user=user)
+    ids = [client.post("/api/tasks/", data={"title": f"T{i}", "status": "todo"}).data["id"] for i in range(3)]
+
+    layer = channel_layer
+    channel = async_to_sync(layer.new_channel)()
+    async_to_sync(layer.group_add)("tasks_all", channel)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        r = client.post("/api/tasks/reorder/", data={"task_id": ids[2], "status": "in_progress", "order": 0})
+    assert r.status_code == 200
+
+    message = async_to_sync(layer.receive)(channel)
+    assert message["type"] == "task_move"
+    assert json.loads(message["text"])["tasks"] == [{"id": ids[2], "status": "in_progress", "order": r.data["moved"][0]["order"], "version": 2}]
+
+
+@pytest.mark.django_db
+def test_lists_and_broadcasts_carry_cards_without_description(create_user, channel_layer, django_capture_on_commit_callbacks):
+    import hashlib
+
+    from asgiref.sync import async_to_sync
+    from rest_framework.test import APIClient
+
+    user = create_user(username="d", email="d@example.com")
+    client = APIClient()
+    client.force_authenticate(user=user)
+    body = "長い本文" * 100
+
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)("tasks_all", channel)
+    with django_capture_on_commit_callbacks(execute=True):
+        created = client.post("/api/tasks/", data={"title": "D", "description": body, "status": "todo"})
+    # 作成・取得の応答は本文を含む
+    assert created.data["description"] == body
+
+    card = json.loads(async_to_sync(channel_layer.receive)(channel)["text"])["task"]
+    assert "description" not in card
+    assert card["description_length"] == len(body)
+    assert card["description_hash"] == hashlib.sha1(body.encode()).hexdigest()[:16]
+
+    listing = client.get("/api/tasks/")
+    assert listing.data == [card]
+    assert "description" not in client.get("/api/tasks/", {"limit": 10}).data["results"][0]
+    # 本文は明示すれば一覧でも返す
+    assert client.get("/api/tasks/", {"fields": "id,description"}).data[0]["description"] == body
+    assert client.get(f"/api/tasks/{created.data['id']}/").data["description"] == body
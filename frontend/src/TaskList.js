@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useCallback, useEffect, useRef, useState } from "react";
 import api from "./api";
 
 import {
@@ -14,6 +14,8 @@ import {
 } from "@mui/material";
 
 import DeleteIcon from "@mui/icons-material/Delete";
+import ExpandLessIcon from "@mui/icons-material/ExpandLess";
+import ExpandMoreIcon from "@mui/icons-material/ExpandMore";
 import HourglassBottomIcon from "@mui/icons-material/HourglassBottom";
 import CheckCircleIcon from "@mui/icons-material/CheckCircle";
 import RadioButtonUncheckedIcon from "@mui/icons-material/RadioButtonUnchecked";
@@ -26,12 +28,45 @@ const TASK_COLORS = {
   done: "#e8f5e9",
 };
 
+// backend/tasks/ordering.py の ORDER_GAP と同じ値
+const ORDER_GAP = 1024;
+
 const STATUS_CONFIG = {
   todo: { color: "#2196f3", icon: <RadioButtonUncheckedIcon fontSize="small" /> },
   in_progress: { color: "#f9a825", icon: <HourglassBottomIcon fontSize="small" /> },
   done: { color: "#2e7d32", icon: <CheckCircleIcon fontSize="small" /> },
 };
 
+// WebSocket のイベントを 1 件タスク一覧に適用する
+function applyEvent(tasks, event) {
+  switch (event.type) {
+    case "task_update":
+      return tasks.some((t) => t.id === event.task.id)
+        ? tasks.map((t) => (t.id === event.task.id ? event.task : t))
+        : [...tasks, event.task];
+
+    case "task_delete":
+      return tasks.filter((t) => t.id !== event.task_id);
+
+    // 並び替えの差分（id, status, order のみ）
+    case "task_move": {
+      const moved = new Map(event.tasks.map((t) => [t.id, t]));
+      return tasks.map((t) =>
+        moved.has(t.id) ? { ...t, ...moved.get(t.id) } : t
+      );
+    }
+
+    case "task_bulk_update": {
+      const updatedTaskIds = new Set(event.tasks.map((t) => t.id));
+      const unchanged = tasks.filter((t) => !updatedTaskIds.has(t.id));
+      return [...unchanged, ...event.tasks];
+    }
+
+    default:
+      return tasks;
+  }
+}
+
 function TaskList({ onLogout }) {
   const [tasks, setTasks] = useState([]);
   const [newTask, setNewTask] = useState("");
@@ -40,13 +75,25 @@ function TaskList({ onLogout }) {
   const [editingId, setEditingId] = useState(null);
   const [editingTitle, setEditingTitle] = useState("");
 
+  // 一覧と配信のカードには本文の長さとハッシュしか無いので、開いたカードの本文だけ取得する
+  const [openId, setOpenId] = useState(null);
+  const [descriptions, setDescriptions] = useState({});
+  const openHash = tasks.find((t) => t.id === openId)?.description_hash;
+
   const me = localStorage.getItem("username");
   const isAdmin = localStorage.getItem("is_staff") === "true";
 
-  useEffect(() => {
+  // 手元の状態が反映済みのボードのリビジョン（再接続時の resume に使う）
+  const revisionRef = useRef(null);
+
+  const loadTasks = useCallback(() => {
     api
       .get("tasks/")
-      .then((res) => setTasks(res.data))
+      .then((res) => {
+        const revision = Number(res.headers["x-board-revision"]);
+        revisionRef.current = Number.isNaN(revision) ? null : revision;
+        setTasks(res.data);
+      })
       .catch(() => {
         onLogout();
         localStorage.removeItem("accessToken");
@@ -55,33 +102,110 @@ function TaskList({ onLogout }) {
   }, [onLogout]);
 
   useEffect(() => {
-    const wsUrl = `wss://realtime-task-app-backend.onrender.com/ws/tasks/`;
-    const ws = new WebSocket(wsUrl);
-
-    ws.onopen = () => {
-      console.log("WebSocket connected - sending authentication");
-      // 🔐 接続後に認証トークンを送信（URLにトークンを含めない）
-      const token = localStorage.getItem("accessToken");
-      ws.send(JSON.stringify({ 
-        type: "auth", 
-        token: token 
-      }));
-    };
+    loadTasks();
+  }, [loadTasks]);
+
+  // 📄 開いたカードの本文を取得する（ハッシュが変わったときだけ取り直す）
+  useEffect(() => {
+    if (openId === null || openHash === undefined) return;
+    if (descriptions[openId]?.hash === openHash) return;
+
+    api
+      .get(`tasks/${openId}/`)
+      .then((res) => {
+        setDescriptions((prev) => ({
+          ...prev,
+          [openId]: { hash: openHash, text: res.data.description },
+        }));
+      })
+      .catch(() => setOpenId(null));
+  }, [openId, openHash, descriptions]);
 
-    ws.onerror = (error) => {
-      console.error("WebSocket error:", error);
+  useEffect(() => {
+    const wsUrl = `wss://realtime-task-app-backend.onrender.com/ws/tasks/`;
+    let ws;
+    let reconnectTimer = null;
+    let closedByUnmount = false;
+    // resume の応答を待つ間に届いたライブイベント（null なら待っていない）
+    let pending = null;
+    // 大きなイベントを zlib 圧縮のバイナリフレームで受け取れるか（ブラウザが展開できる場合のみ）
+    const canInflate = typeof DecompressionStream !== "undefined";
+    // バイナリフレームの展開は非同期なので、受信順に処理するためつないでおく
+    let received = Promise.resolve();
+
+    const connect = () => {
+      ws = new WebSocket(wsUrl);
+      ws.binaryType = "arraybuffer";
+      pending = null;
+
+      ws.onopen = () => {
+        console.log("WebSocket connected - sending authentication");
+        // 🔐 接続後に認証トークンを送信（URLにトークンを含めない）
+        const token = localStorage.getItem("accessToken");
+        ws.send(JSON.stringify({ 
+          type: "auth", 
+          token: token,
+          ...(canInflate && { encoding: "zlib" }),
+        }));
+      };
+
+      ws.onerror = (error) => {
+        console.error("WebSocket error:", error);
+      };
+
+      ws.onclose = () => {
+        console.log("WebSocket disconnected");
+        // 🔁 切断されたら再接続し、見逃したイベントは resume で受け取る
+        if (!closedByUnmount) {
+          reconnectTimer = setTimeout(connect, 2000);
+        }
+      };
+
+      ws.onmessage = (e) => {
+        received = received
+          .then(() => decodeFrame(e.data))
+          .then((text) => handleMessage(JSON.parse(text)))
+          .catch((error) => console.error("WebSocket message error:", error));
+      };
     };
 
-    ws.onclose = () => {
-      console.log("WebSocket disconnected");
+    // 🗜️ バイナリフレームは zlib 圧縮された JSON
+    const decodeFrame = (frame) => {
+      if (typeof frame === "string") {
+        return frame;
+      }
+      const stream = new Blob([frame]).stream().pipeThrough(new DecompressionStream("deflate"));
+      return new Response(stream).text();
     };
 
-    ws.onmessage = (e) => {
-      const data = JSON.parse(e.data);
+    const handleMessage = (data) => {
 
       // ✅ 認証成功メッセージ
       if (data.type === "authenticated") {
         console.log("WebSocket authenticated:", data.message);
+        if (revisionRef.current !== null) {
+          pending = [];
+          ws.send(JSON.stringify({ type: "resume", since: revisionRef.current }));
+        }
+        return;
+      }
+
+      // 🔄 差分を再送できない場合は全件を取り直す
+      if (data.type === "resnapshot") {
+        pending = null;
+        loadTasks();
+        return;
+      }
+
+      // 🔁 再送の完了: 待っている間のイベントをリビジョン順に重複なく適用する
+      if (data.type === "resumed") {
+        const since = revisionRef.current ?? 0;
+        const seen = new Set();
+        const events = (pending ?? [])
+          .filter((ev) => ev.revision > since && !seen.has(ev.revision) && seen.add(ev.revision))
+          .sort((a, b) => a.revision - b.revision);
+        pending = null;
+        events.forEach(applyLive);
         return;
       }
 
@@ -91,29 +215,34 @@ function TaskList({ onLogout }) {
         return;
       }
 
-      if (data.type === "task_update") {
-        setTasks((prev) =>
-          prev.some((t) => t.id === data.task.id)
-            ? prev.map((t) => (t.id === data.task.id ? data.task : t))
-            : [...prev, data.task]
-        );
+      if (pending !== null) {
+        pending.push(data);
+        return;
       }
+      applyLive(data);
+    };
 
-      if (data.type === "task_delete") {
-        setTasks((prev) => prev.filter((t) => t.id !== data.task_id));
+    const applyLive = (data) => {
+      if (typeof data.revision === "number") {
+        revisionRef.current = Math.max(revisionRef.current ?? 0, data.revision);
       }
 
-      if (data.type === "task_bulk_update") {
-        setTasks((prev) => {
-          const updatedTaskIds = new Set(data.tasks.map((t) => t.id));
-          const unchanged = prev.filter((t) => !updatedTaskIds.has(t.id));
-          return [...unchanged, ...data.tasks];
-        });
+      if (data.type === "task_batch") {
+        setTasks((prev) => data.events.reduce(applyEvent, prev));
+        return;
       }
+
+      setTasks((prev) => applyEvent(prev, data));
     };
 
-    return () => ws.close();
-  }, []);
+    connect();
+
+    return () => {
+      closedByUnmount = true;
+      clearTimeout(reconnectTimer);
+      ws.close();
+    };
+  }, [loadTasks]);
 
   const handleAddTask = () => {
     if (!newTask || !newTask.trim()) {
@@ -151,8 +280,7 @@ function TaskList({ onLogout }) {
     }
 
     api
-      .put(`tasks/${task.id}/`, {
-        ...task,
+      .patch(`tasks/${task.id}/`, {
         title: editingTitle,
       })
       .catch(() => {
@@ -188,36 +316,29 @@ function TaskList({ onLogout }) {
       return;
     }
 
+    // 楽観的更新: サーバーと同じく前後のタスクの order の中間に置く
+    // （確定した order は task_move で届く）
     setTasks((prev) => {
-      const all = [...prev];
-      const movedTask = all.find((t) => t.id === taskId);
+      const movedTask = prev.find((t) => t.id === taskId);
       if (!movedTask) return prev;
 
-      const sourceTasks = all
-        .filter((t) => t.status === source.droppableId && t.id !== taskId)
+      const destinationTasks = prev
+        .filter((t) => t.status === destination.droppableId && t.id !== taskId)
         .sort((a, b) => a.order - b.order);
 
-      const destinationTasks =
-        source.droppableId === destination.droppableId
-          ? sourceTasks
-          : all
-              .filter((t) => t.status === destination.droppableId)
-              .sort((a, b) => a.order - b.order);
-
-      destinationTasks.splice(destination.index, 0, {
-        ...movedTask,
-        status: destination.droppableId,
-      });
-
-      destinationTasks.forEach((t, i) => (t.order = i));
-      sourceTasks.forEach((t, i) => (t.order = i));
-
-      return all.map((t) => {
-        const updated =
-          destinationTasks.find((d) => d.id === t.id) ||
-          sourceTasks.find((s) => s.id === t.id);
-        return updated ? { ...t, ...updated } : t;
-      });
+      const before = destinationTasks[destination.index - 1];
+      const after = destinationTasks[destination.index];
+      let order;
+      if (before && after) order = (before.order + after.order) / 2;
+      else if (before) order = before.order + ORDER_GAP;
+      else if (after) order = after.order - ORDER_GAP;
+      else order = ORDER_GAP;
+
+      return prev.map((t) =>
+        t.id === taskId
+          ? { ...t, status: destination.droppableId, order }
+          : t
+      );
     });
 
     api
@@ -391,8 +512,33 @@ function TaskList({ onLogout }) {
                                         {task.title}
                                       </Typography>
                                     )}
+
+                                    {openId === task.id && (
+                                      <Typography
+                                        variant="body2"
+                                        color="text.secondary"
+                                        sx={{ mt: 0.5, whiteSpace: "pre-wrap", wordBreak: "break-word" }}
+                                      >
+                                        {descriptions[task.id]?.hash === task.description_hash
+                                          ? descriptions[task.id].text
+                                          : "読み込み中..."}
+                                      </Typography>
+                                    )}
                                   </Stack>
 
+                                  {task.description_length > 0 && (
+                                    <IconButton
+                                      onClick={() => setOpenId(openId === task.id ? null : task.id)}
+                                      size="small"
+                                    >
+                                      {openId === task.id ? (
+                                        <ExpandLessIcon fontSize="small" />
+                                      ) : (
+                                        <ExpandMoreIcon fontSize="small" />
+                                      )}
+                                    </IconButton>
+                                  )}
+
                                   <IconButton
                                     onClick={() => deleteTask(task.id)}
                                     size="small"